@@ -0,0 +1,132 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Seconds of each TradingView interval unit, e.g. "15m" or "1W"
+INTERVAL_UNITS = {'m': 60, 'h': 60 * 60, 'd': 24 * 60 * 60,
+                  'W': 7 * 24 * 60 * 60, 'M': 30 * 24 * 60 * 60}
+
+
+def interval_seconds(interval):
+    """Return the length of an interval such as "15m", or None if unknown."""
+    if not interval or interval[-1] not in INTERVAL_UNITS:
+        return None
+    try:
+        return int(interval[:-1] or 1) * INTERVAL_UNITS[interval[-1]]
+    except ValueError:
+        return None
+
+
+class PendingFetch:
+    """Upstream fetch of some keys that other requests can wait for."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.results = {}
+        self.error = None
+
+    def wait(self, key):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.results[key]
+
+
+class AnalysisCache:
+    """LRU cache of analyses per (screener, interval, symbol).
+
+    An entry lives for 1/60 of its interval (1 second for 1m, 1 minute for 1h),
+    bounded by max_ttl. Symbols that another request is already fetching are
+    not fetched again: the request waits for that fetch and shares its result.
+    """
+
+    def __init__(self, fetch, max_entries=1000, max_ttl=60, clock=time.monotonic):
+        # fetch(screener, interval, symbols) returns {symbol: analysis}
+        self.fetch = fetch
+        self.max_entries = max_entries
+        self.max_ttl = max_ttl
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.pending = {}
+        self.counters = {'hits': 0, 'misses': 0, 'coalesced': 0, 'evictions': 0,
+                         'upstream_calls': 0, 'upstream_errors': 0}
+
+    def get_ttl(self, interval):
+        seconds = interval_seconds(interval)
+        if seconds is None:
+            return min(1, self.max_ttl)
+        return min(max(seconds / 60, 1), self.max_ttl)
+
+    def get_many(self, screener, interval, symbols):
+        """Return {symbol: analysis} for symbols, fetching only the missing ones."""
+        # Without symbols the upstream call raises the usual error
+        if not symbols or self.max_ttl <= 0 or self.max_entries <= 0:
+            with self.lock:
+                self.counters['misses'] += len(symbols)
+                self.counters['upstream_calls'] += 1
+            return self.fetch(screener, interval, symbols)
+
+        now = self.clock()
+        results = {}
+        waiting = {}
+        to_fetch = []
+        own_fetch = PendingFetch()
+        with self.lock:
+            for symbol in dict.fromkeys(symbols):
+                key = (screener, interval, symbol)
+                entry = self.entries.get(key)
+                if entry is not None and entry[0] > now:
+                    self.entries.move_to_end(key)
+                    self.counters['hits'] += 1
+                    results[symbol] = entry[1]
+                elif key in self.pending:
+                    self.counters['coalesced'] += 1
+                    waiting[symbol] = self.pending[key]
+                else:
+                    self.counters['misses'] += 1
+                    self.pending[key] = own_fetch
+                    to_fetch.append(symbol)
+
+        if to_fetch:
+            self.fetch_pending(screener, interval, to_fetch, own_fetch)
+            results.update((symbol, own_fetch.wait((screener, interval, symbol))) for symbol in to_fetch)
+        for symbol, pending_fetch in waiting.items():
+            results[symbol] = pending_fetch.wait((screener, interval, symbol))
+        return results
+
+    def fetch_pending(self, screener, interval, symbols, pending_fetch):
+        keys = [(screener, interval, symbol) for symbol in symbols]
+        try:
+            analyses = self.fetch(screener, interval, symbols)
+            fetched = [analyses[symbol] for symbol in symbols]
+        except Exception as error:
+            with self.lock:
+                self.counters['upstream_calls'] += 1
+                self.counters['upstream_errors'] += 1
+                for key in keys:
+                    del self.pending[key]
+            pending_fetch.error = error
+            pending_fetch.done.set()
+            return
+
+        expires_at = self.clock() + self.get_ttl(interval)
+        with self.lock:
+            self.counters['upstream_calls'] += 1
+            for key, analysis in zip(keys, fetched):
+                pending_fetch.results[key] = analysis
+                self.entries[key] = (expires_at, analysis)
+                self.entries.move_to_end(key)
+                del self.pending[key]
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.counters['evictions'] += 1
+        pending_fetch.done.set()
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters, entries=len(self.entries), max_entries=self.max_entries,
+                         max_ttl=self.max_ttl)
+        lookups = stats['hits'] + stats['misses'] + stats['coalesced']
+        stats['hit_ratio'] = round((stats['hits'] + stats['coalesced']) / lookups, 4) if lookups else 0.0
+        return stats
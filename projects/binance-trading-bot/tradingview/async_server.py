@@ -0,0 +1,234 @@
+import asyncio
+import json
+import logging
+import time
+from urllib.parse import parse_qs, urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Seconds a keep-alive connection may stay idle, like channel_timeout of waitress
+IDLE_TIMEOUT = 5
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           500: 'Internal Server Error'}
+
+
+class Batch:
+    """Symbols of the requests for one (screener, interval) waiting to be fetched."""
+
+    def __init__(self):
+        self.symbols = {}
+        self.requests = []
+        self.timer = None
+
+
+class UpstreamBatcher:
+    """Merge the symbols requested within a short window into one upstream call.
+
+    Requests for the same screener and interval that arrive within `window` seconds
+    share a single call of fetch(screener, interval, symbols), run in a thread, and
+    each gets back the analyses of its own symbols. A batch is sent early once it
+    holds max_symbols symbols. If a merged call fails, the requests are fetched one
+    by one so an invalid symbol only fails the request that asked for it.
+    """
+
+    def __init__(self, fetch, window=0.05, max_symbols=200):
+        self.fetch = fetch
+        self.window = window
+        self.max_symbols = max_symbols
+        self.batches = {}
+        self.counters = {'requests': 0, 'batches': 0, 'batched_symbols': 0, 'fallbacks': 0}
+
+    async def get_many(self, screener, interval, symbols):
+        key = (screener, interval)
+        if not symbols:
+            # Merged into a batch it would get an empty result; fetched alone it gets the
+            # same "Symbols is empty" error as the waitress mode, whatever the timing
+            self.counters['requests'] += 1
+            return await self.run_fetch(key, symbols)
+
+        loop = asyncio.get_running_loop()
+        batch = self.batches.get(key)
+        if batch is None:
+            batch = self.batches[key] = Batch()
+            batch.timer = loop.call_later(self.window, self.flush, key)
+
+        future = loop.create_future()
+        batch.symbols.update(dict.fromkeys(symbols))
+        batch.requests.append((symbols, future))
+        self.counters['requests'] += 1
+        if len(batch.symbols) >= self.max_symbols:
+            batch.timer.cancel()
+            self.flush(key)
+        return await future
+
+    def flush(self, key):
+        batch = self.batches.pop(key)
+        self.counters['batches'] += 1
+        self.counters['batched_symbols'] += len(batch.symbols)
+        asyncio.ensure_future(self.fetch_batch(key, batch))
+
+    async def run_fetch(self, key, symbols):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.fetch, key[0], key[1], list(symbols))
+
+    async def fetch_batch(self, key, batch):
+        try:
+            analyses = await self.run_fetch(key, batch.symbols)
+        except Exception as error:
+            if len(batch.requests) == 1:
+                set_future(batch.requests[0][1], error=error)
+                return
+            self.counters['fallbacks'] += 1
+            await asyncio.gather(*[self.fetch_request(key, symbols, future)
+                                   for symbols, future in batch.requests])
+            return
+
+        for symbols, future in batch.requests:
+            set_future(future, result=dict((symbol, analyses[symbol]) for symbol in symbols))
+
+    async def fetch_request(self, key, symbols, future):
+        try:
+            set_future(future, result=await self.run_fetch(key, symbols))
+        except Exception as error:
+            set_future(future, error=error)
+
+    def stats(self):
+        stats = dict(self.counters)
+        stats['window_ms'] = self.window * 1000
+        stats['symbols_per_batch'] = (round(stats['batched_symbols'] / stats['batches'], 2)
+                                      if stats['batches'] else 0.0)
+        return stats
+
+
+def set_future(future, result=None, error=None):
+    # The client may be gone and its request cancelled
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+class AsyncServer:
+    """Minimal HTTP/1.1 server answering the GET / and /status routes of main.py."""
+
+    def __init__(self, batcher, build_response, routes, latency_metrics):
+        # routes maps the other GET paths, like /status, to functions returning their body
+        self.batcher = batcher
+        self.build_response = build_response
+        self.routes = routes
+        self.latency_metrics = latency_metrics
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                if not request_line.strip():
+                    break
+                started = time.perf_counter()
+                try:
+                    headers = await self.read_headers(reader)
+                except ValueError as error:
+                    # The body length is unknown, so the connection cannot be reused
+                    logger.warning("Bad request headers: %s", error)
+                    self.write_response(writer, 400, self.encode_body({'error': 'Bad Request'}), False)
+                    await writer.drain()
+                    break
+                keep_alive = self.is_keep_alive(request_line, headers)
+
+                try:
+                    endpoint, status, body, fetched = await self.handle_request(request_line)
+                    data = self.encode_body(body)
+                except Exception:
+                    # Answer like Flask does when a view raises, instead of dropping the connection
+                    logger.exception("Request failed: %s", request_line)
+                    endpoint, status, fetched = None, 500, None
+                    data = self.encode_body({'error': 'Internal Server Error'})
+                self.write_response(writer, status, data, keep_alive)
+                finished = time.perf_counter()
+                if endpoint == '/':
+                    self.latency_metrics.observe(endpoint, 'serialization', finished - fetched)
+                if endpoint is not None and endpoint != '/metrics':
+                    self.latency_metrics.observe(endpoint, 'total', finished - started)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def read_headers(self, reader):
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        # A malformed or negative Content-Length raises ValueError
+        length = int(headers.get('content-length') or 0)
+        if length < 0:
+            raise ValueError(f"Invalid Content-Length: {length}")
+        if length:
+            await reader.readexactly(length)
+        return headers
+
+    def is_keep_alive(self, request_line, headers):
+        connection = headers.get('connection', '').lower()
+        if request_line.rstrip().endswith(b'HTTP/1.0'):
+            return connection == 'keep-alive'
+        return connection != 'close'
+
+    async def handle_request(self, request_line):
+        """Return the endpoint, status and body answering a request line, and when the
+        upstream fetch ended."""
+        try:
+            method, target, _ = request_line.decode('latin-1').split(' ', 2)
+        except ValueError:
+            return None, 400, {'error': 'Bad Request'}, None
+        url = urlsplit(target)
+        if url.path != '/' and url.path not in self.routes:
+            return None, 404, {'error': 'Not Found'}, None
+        if method != 'GET':
+            return None, 405, {'error': 'Method Not Allowed'}, None
+        if url.path != '/':
+            return url.path, 200, self.routes[url.path](), None
+
+        args = parse_qs(url.query)
+        logger.info("Request: %s", args)
+        symbols = args.get('symbols', [])
+        screener = args.get('screener', [None])[0]
+        interval = args.get('interval', [None])[0]
+        started = time.perf_counter()
+        try:
+            analyses = await self.batcher.get_many(screener, interval, symbols)
+        except Exception as error:
+            logger.exception("Request failed: %s", error)
+            return '/', 500, {'error': str(error)}, time.perf_counter()
+        finally:
+            self.latency_metrics.observe('/', 'upstream', time.perf_counter() - started)
+        fetched = time.perf_counter()
+        return '/', 200, self.build_response(symbols, screener, interval, analyses), fetched
+
+    def encode_body(self, body):
+        return (json.dumps(body, sort_keys=True, separators=(',', ':')) + '\n').encode('utf-8')
+
+    def write_response(self, writer, status, data, keep_alive):
+        head = (f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                "Content-Type: application/json\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + data)
+
+
+async def serve(host, port, server):
+    listener = await asyncio.start_server(server.handle_connection, host, port, backlog=1024)
+    logger.info("Serving on http://%s:%s with asyncio", host, port)
+    async with listener:
+        await listener.serve_forever()
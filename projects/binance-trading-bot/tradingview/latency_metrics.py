@@ -0,0 +1,64 @@
+import bisect
+import threading
+from collections import defaultdict
+
+# Upper bounds in milliseconds of the histogram buckets, the last one is unbounded
+BUCKETS_MS = [1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+class LatencyHistogram:
+    """Count of observed durations per bucket, with their total and maximum."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, milliseconds):
+        self.counts[bisect.bisect_left(BUCKETS_MS, milliseconds)] += 1
+        self.count += 1
+        self.sum_ms += milliseconds
+        self.max_ms = max(self.max_ms, milliseconds)
+
+    def quantile(self, q):
+        """Return the upper bound of the bucket holding the q quantile."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max_ms
+
+    def snapshot(self):
+        buckets = dict(('le_' + str(bound), count) for bound, count in zip(BUCKETS_MS, self.counts))
+        buckets['le_inf'] = self.counts[-1]
+        return {
+            'count': self.count,
+            'mean_ms': round(self.sum_ms / self.count, 3) if self.count else 0.0,
+            'max_ms': round(self.max_ms, 3),
+            'p50_ms': self.quantile(0.5),
+            'p95_ms': self.quantile(0.95),
+            'p99_ms': self.quantile(0.99),
+            'buckets': buckets,
+        }
+
+
+class LatencyMetrics:
+    """Latency histograms per endpoint and stage (upstream, serialization, total)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = defaultdict(lambda: defaultdict(LatencyHistogram))
+
+    def observe(self, endpoint, stage, seconds):
+        with self.lock:
+            self.histograms[endpoint][stage].observe(seconds * 1000)
+
+    def snapshot(self):
+        with self.lock:
+            return dict((endpoint, dict((stage, histogram.snapshot()) for stage, histogram in stages.items()))
+                        for endpoint, stages in self.histograms.items())
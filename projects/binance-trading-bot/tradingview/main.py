@@ -1,10 +1,18 @@
+import atexit
+import itertools
 import logging
+import logging.handlers
+import queue
 import sys
+import time
 import colorlog
 import os
 
 from flask import Flask, jsonify, request
-from tradingview_ta import get_multiple_analysis
+from tradingview_ta import TradingView, get_multiple_analysis
+
+from analysis_cache import AnalysisCache
+from latency_metrics import LatencyMetrics
 
 app = Flask(__name__)
 
@@ -13,16 +21,42 @@ logger.setLevel(os.environ.get("BINANCE_TRADINGVIEW_LOG_LEVEL", logging.DEBUG))
 sh = logging.StreamHandler(sys.stdout)
 sh.setFormatter(colorlog.ColoredFormatter(
     '%(log_color)s [%(asctime)s] %(levelname)s [%(filename)s.%(funcName)s:%(lineno)d] %(message)s', datefmt='%a, %d %b %Y %H:%M:%S'))
-logger.addHandler(sh)
 
 
-@app.route('/', methods=['GET'])
-def index():
-    logger.info("Request: "+str(request.args))
-    symbols = request.args.getlist('symbols')
-    screener = request.args.get('screener')
-    interval = request.args.get('interval')
+class RecordQueueHandler(logging.handlers.QueueHandler):
+    """Put the records on the queue as they are, without formatting them first.
+
+    QueueHandler.prepare formats the message in the calling thread so the record can
+    be pickled. The queue stays in this process, so the listener thread formats it.
+    The logged arguments must not be changed after the call, which holds here.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+# Requests only put their records on a queue; a background thread formats and writes them
+if os.environ.get("BINANCE_TRADINGVIEW_LOG_QUEUE", "true").lower() == "true":
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(RecordQueueHandler(log_queue))
+    log_listener = logging.handlers.QueueListener(log_queue, sh)
+    log_listener.start()
+    atexit.register(log_listener.stop)
+else:
+    logger.addHandler(sh)
 
+# Log the full response body of one request out of N, the others only log their symbols
+response_log_every = max(int(os.environ.get("BINANCE_TRADINGVIEW_LOG_RESPONSE_EVERY", "1")), 1)
+response_counter = itertools.count()
+
+latency_metrics = LatencyMetrics()
+
+# Point to a local stub (see stub_scanner.py) instead of the TradingView scanner
+if os.environ.get("BINANCE_TRADINGVIEW_SCAN_URL"):
+    TradingView.scan_url = os.environ["BINANCE_TRADINGVIEW_SCAN_URL"].rstrip('/') + '/'
+
+
+def fetch_analysis(screener, interval, symbols):
     analyse = get_multiple_analysis(
         screener, interval, symbols
     )
@@ -35,7 +69,22 @@ def index():
                 'summary': symbolAnalyse.summary, 'time': symbolAnalyse.time.isoformat(), 'oscillators': symbolAnalyse.oscillators, 'moving_averages': symbolAnalyse.moving_averages, 'indicators': symbolAnalyse.indicators}
         else:
             result[symbol] = {}
-        # logger.info('Processed '+symbol)
+    return result
+
+
+# Many bot instances poll the same symbols within seconds, so their analyses are shared
+# for a short while. Setting BINANCE_TRADINGVIEW_CACHE_MAX_TTL to 0 disables the cache.
+analysis_cache = AnalysisCache(
+    fetch_analysis,
+    max_entries=int(os.environ.get("BINANCE_TRADINGVIEW_CACHE_SIZE", "1000")),
+    max_ttl=float(os.environ.get("BINANCE_TRADINGVIEW_CACHE_MAX_TTL", "60"))
+)
+
+
+def build_response(symbols, screener, interval, analyses):
+    result = {}
+    for symbol in symbols:
+        result[symbol] = analyses[symbol]
 
     response = {
         'request': {
@@ -45,16 +94,64 @@ def index():
         },
         'result': result
     }
-    logger.info("Response: "+str(response))
-    return jsonify(response)
+    if next(response_counter) % response_log_every == 0:
+        logger.info("Response: %s", response)
+    else:
+        logger.debug("Response for %s", symbols)
+    return response
+
+
+@app.route('/', methods=['GET'])
+def index():
+    started = time.perf_counter()
+    logger.info("Request: %s", request.args)
+    symbols = request.args.getlist('symbols')
+    screener = request.args.get('screener')
+    interval = request.args.get('interval')
+
+    analyses = analysis_cache.get_many(screener, interval, symbols)
+    fetched = time.perf_counter()
+    response = jsonify(build_response(symbols, screener, interval, analyses))
+
+    finished = time.perf_counter()
+    latency_metrics.observe('/', 'upstream', fetched - started)
+    latency_metrics.observe('/', 'serialization', finished - fetched)
+    latency_metrics.observe('/', 'total', finished - started)
+    return response
 
 @app.route('/status', methods=['GET'])
 def status():
-    return jsonify({'status': 'ok'})
+    started = time.perf_counter()
+    response = jsonify({'status': 'ok', 'cache': analysis_cache.stats()})
+    latency_metrics.observe('/status', 'total', time.perf_counter() - started)
+    return response
 
-if __name__ == "__main__":
-    from waitress import serve
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return jsonify({'latency': latency_metrics.snapshot()})
+
+def serve_async(port):
+    """Serve with asyncio, merging the symbols of concurrent requests into batched upstream calls."""
+    import asyncio
+    import async_server
+
+    batcher = async_server.UpstreamBatcher(
+        analysis_cache.get_many,
+        window=float(os.environ.get("BINANCE_TRADINGVIEW_BATCH_WINDOW_MS", "50")) / 1000
+    )
+
+    def get_status():
+        return {'status': 'ok', 'cache': analysis_cache.stats(), 'batches': batcher.stats()}
 
+    def get_metrics():
+        return {'latency': latency_metrics.snapshot()}
+
+    server = async_server.AsyncServer(batcher, build_response, {'/status': get_status, '/metrics': get_metrics},
+                                      latency_metrics)
+    asyncio.run(async_server.serve("0.0.0.0", port, server))
+
+
+if __name__ == "__main__":
     port_str = os.environ.get("BINANCE_TRADINGVIEW_PORT", "8080")
     try:
         port = int(port_str)
@@ -62,7 +159,12 @@ if __name__ == "__main__":
         print(f"Invalid port value: {port_str}. Using default value of 8080.")
         port = 8080
 
+    # "async" serves with asyncio and batches upstream calls, "waitress" (default) with threads
+    if os.environ.get("BINANCE_TRADINGVIEW_SERVER", "waitress") == "async":
+        serve_async(port)
+        sys.exit(0)
 
+    from waitress import serve
     serve(
         app,
         host="0.0.0.0",
@@ -0,0 +1,87 @@
+# ----------------------------------------------------------------------------------------
+# Local stand-in for the TradingView scanner API, used to try the proxy without network.
+# It answers POST /<screener>/scan with made up values for every requested column, stable
+# per symbol and column, and can delay the answers to mimic a slow upstream.
+#
+# Usage: python stub_scanner.py --port 8090 --delay 0.5
+#        BINANCE_TRADINGVIEW_SCAN_URL=http://127.0.0.1:8090 python main.py
+# ----------------------------------------------------------------------------------------
+
+import json
+import time
+import zlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def generate_value(symbol, column):
+    """Return a stable made up value for a column of a symbol."""
+    seed = zlib.crc32((symbol + '|' + column).encode('utf-8'))
+    if column.startswith('Recommend.'):
+        return round((seed % 2001 - 1000) / 1000, 3)
+    return round(50 + (seed % 10000) / 100, 2)
+
+
+class ScannerStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            print(f"[STUB] {self.address_string()} {format % args}")
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}')
+        if not self.path.rstrip('/').endswith('/scan'):
+            self.send_json(404, {'error': 'Not Found'})
+            return
+
+        tickers = body.get('symbols', {}).get('tickers', [])
+        columns = body.get('columns', [])
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.symbols += len(tickers)
+
+        time.sleep(self.server.delay)
+        data = [{'s': ticker.upper(), 'd': [generate_value(ticker.upper(), column) for column in columns]}
+                for ticker in tickers if ticker.upper() not in self.server.unknown]
+        self.send_json(200, {'totalCount': len(data), 'data': data})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stub of the TradingView scanner API.")
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--delay', type=float, default=0.0, help="seconds to wait before answering")
+    parser.add_argument('--unknown', nargs='*', default=[], help="symbols answered without data, e.g. BINANCE:FOOUSDT")
+    parser.add_argument('--verbose', action='store_true', help="log every request")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), ScannerStubHandler)
+    server.delay = args.delay
+    server.unknown = set(symbol.upper() for symbol in args.unknown)
+    server.verbose = args.verbose
+    server.requests = 0
+    server.symbols = 0
+    server.lock = threading.Lock()
+
+    print(f"[STUB] TradingView scanner stub listening on http://127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"[STUB] {server.requests} scan requests for {server.symbols} symbols")
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,58 +1,133 @@
 #!/usr/bin/env python3
 
-import sys
+import argparse
+import io
 import os
-import json
+from concurrent.futures import ProcessPoolExecutor
 
-from fontTools.ttLib import TTFont, sfnt
+import brotli
+from fontTools.ttLib import TTFont, sfnt, woff2
 from fontTools.misc.timeTools import timestampNow
-sfnt.USE_ZOPFLI = True
 
-if len(sys.argv) < 2:
-    print("Usage: %s <font file>" % sys.argv[0])
-    sys.exit(1)
+# Compression of the WOFF (zlib, with zopfli if available) and WOFF2 (brotli)
+# files. Release builds spend the time on the smallest files, dev builds only
+# need fonts that load.
+COMPRESSION = {
+    'release': {'zopfli': True, 'brotli_quality': 11},
+    'dev': {'zopfli': False, 'brotli_quality': 4},
+}
+
+FLAVORS = [None, 'woff', 'woff2']
 
-font_file = sys.argv[1]
-font_name = os.path.splitext(os.path.basename(font_file))[0]
-
-
-font = TTFont(font_file, recalcBBoxes=False, recalcTimestamp=False)
-
-# fix timestamp to the epoch
-font['head'].created = 0
-font['head'].modified = 0
-
-# remove fontforge timestamps
-if 'FFTM' in font:
-    del font['FFTM']
-
-# remove redundant GDEF table
-if 'GDEF' in font:
-    del font['GDEF']
-
-# remove Macintosh table
-# https://developer.apple.com/fonts/TrueType-Reference-Manual/RM06/Chap6cmap.html
-font['name'].names = [record for record in font['name'].names if record.platformID != 1]
-font['cmap'].tables = [table for table in font['cmap'].tables if table.platformID != 1]
-
-# fix OS/2 and hhea metrics
-glyf = font['glyf']
-ascent = int(max(glyf[c].yMax for c in font.getGlyphOrder() if hasattr(glyf[c], "yMax")))
-descent = -int(min(glyf[c].yMin for c in font.getGlyphOrder() if hasattr(glyf[c], "yMin")))
-
-font['OS/2'].usWinAscent = ascent
-font['OS/2'].usWinDescent = descent
-
-font['hhea'].ascent = ascent
-font['hhea'].descent = -descent
-
-# save TTF
-font.save(font_file, reorderTables=None)
-
-# save WOFF
-font.flavor = 'woff'
-font.save(os.path.join('woff', font_name + '.woff'), reorderTables=None)
-
-# save WOFF2
-font.flavor = 'woff2'
-font.save(os.path.join('woff2', font_name + '.woff2'), reorderTables=None)
+
+class BrotliQuality(object):
+    """Stand-in for the brotli module used by fontTools.ttLib.woff2, which
+    does not let callers pick the quality."""
+
+    def __init__(self, quality):
+        self.quality = quality
+
+    def compress(self, data, **kwargs):
+        return brotli.compress(data, quality=self.quality, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(brotli, name)
+
+
+def set_compression(compression):
+    sfnt.USE_ZOPFLI = COMPRESSION[compression]['zopfli']
+    woff2.brotli = BrotliQuality(COMPRESSION[compression]['brotli_quality'])
+
+
+def get_output_path(font_file, flavor):
+    if flavor is None:
+        return font_file
+    font_name = os.path.splitext(os.path.basename(font_file))[0]
+    return os.path.join(flavor, font_name + '.' + flavor)
+
+
+def get_vertical_extent(font):
+    """Return the highest yMax and lowest yMin of the glyphs in one pass."""
+    glyf = font['glyf']
+    y_max = y_min = None
+    for name in font.getGlyphOrder():
+        glyph = glyf[name]
+        if not hasattr(glyph, 'yMax'):
+            continue
+        if y_max is None or glyph.yMax > y_max:
+            y_max = glyph.yMax
+        if y_min is None or glyph.yMin < y_min:
+            y_min = glyph.yMin
+    return y_max, y_min
+
+
+def fix_font(font):
+    # fix timestamp to the epoch
+    font['head'].created = 0
+    font['head'].modified = 0
+
+    # remove fontforge timestamps
+    if 'FFTM' in font:
+        del font['FFTM']
+
+    # remove redundant GDEF table
+    if 'GDEF' in font:
+        del font['GDEF']
+
+    # remove Macintosh table
+    # https://developer.apple.com/fonts/TrueType-Reference-Manual/RM06/Chap6cmap.html
+    font['name'].names = [record for record in font['name'].names if record.platformID != 1]
+    font['cmap'].tables = [table for table in font['cmap'].tables if table.platformID != 1]
+
+    # fix OS/2 and hhea metrics
+    y_max, y_min = get_vertical_extent(font)
+    ascent = int(y_max)
+    descent = -int(y_min)
+
+    font['OS/2'].usWinAscent = ascent
+    font['OS/2'].usWinDescent = descent
+
+    font['hhea'].ascent = ascent
+    font['hhea'].descent = -descent
+
+
+def encode_font(font_file, font_data, flavor, compression):
+    """Fix a font read from font_data and save it in one flavor."""
+    set_compression(compression)
+    font = TTFont(io.BytesIO(font_data), recalcBBoxes=False, recalcTimestamp=False)
+    fix_font(font)
+    font.flavor = flavor
+    output_path = get_output_path(font_file, flavor)
+    font.save(output_path, reorderTables=None)
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Fix the metrics of TTF fonts and save them as TTF, WOFF and WOFF2.")
+    parser.add_argument('font_files', nargs='+', metavar='font file')
+    parser.add_argument('--compression', choices=sorted(COMPRESSION), default='release',
+                        help="zopfli and brotli 11 for release, faster settings for dev builds")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="processes encoding the fonts (1 encodes them in this process)")
+    args = parser.parse_args()
+
+    # The TTF is saved over its input, so every font is read before any encode starts
+    font_data = {}
+    for font_file in args.font_files:
+        with open(font_file, 'rb') as f:
+            font_data[font_file] = f.read()
+
+    jobs = [(font_file, font_data[font_file], flavor, args.compression)
+            for font_file in args.font_files for flavor in FLAVORS]
+    if args.workers <= 1:
+        outputs = [encode_font(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(args.workers) as executor:
+            outputs = list(executor.map(encode_font, *zip(*jobs)))
+
+    for output_path in outputs:
+        print(output_path)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Micro-benchmark of the TFM metrics lookups over the fonts used by KaTeX.
+
+The fonts are located with kpsewhich, or read from --fonts-dir. For each font
+this times:
+
+- reading the file one byte at a time (read_tfm_file_by_byte) against the
+  bulk reader (read_tfm_file), checking both decode the same tables;
+- the per-character kern scan that get_char_metrics used to run
+  (LigKernProgram.execute for every character) against the precomputed kern
+  index, checking both give the same kern tables.
+
+    python benchmark_tfm.py [--fonts-dir DIR] [--repeat N]
+"""
+
+import argparse
+import os
+import timeit
+
+import parse_tfm
+from extract_tfms import FONTS, find_font_path
+
+
+def scan_kern_table(tfm, info):
+    char_kern_table = {}
+    if info.has_ligkern():
+        for char in range(tfm.start_char, tfm.end_char + 1):
+            kern = tfm.ligkern_program.execute(info.ligkern_start(), char)
+            if kern:
+                char_kern_table[char] = tfm.kern_table[kern]
+    return char_kern_table
+
+
+def scan_all(tfm):
+    return [scan_kern_table(tfm, info) for info in tfm.char_info]
+
+
+def lookup_all(font_path):
+    tfm = parse_tfm.read_tfm_file(font_path)
+    return [tfm.kern_index.get(tfm.start_char + index, {})
+            for index in range(len(tfm.char_info))]
+
+
+def get_tables(tfm):
+    return (tfm.start_char, tfm.end_char,
+            [(info.width_index, info.height_index, info.depth_index,
+              info.italic_index, info.tag, info.remainder)
+             for info in tfm.char_info],
+            list(tfm.width_table), list(tfm.height_table),
+            list(tfm.depth_table), list(tfm.italic_table),
+            tfm.ligkern_program.program, list(tfm.kern_table))
+
+
+def print_results(title, baseline, candidate, results):
+    print('%-14s %6s %12s %12s %8s' % (
+        title, 'chars', baseline + ' (ms)', candidate + ' (ms)', 'speedup'))
+    for font_name, chars, baseline_time, candidate_time in results:
+        print('%-14s %6d %12.3f %12.3f %7.1fx' % (
+            font_name, chars, baseline_time * 1000, candidate_time * 1000,
+            baseline_time / candidate_time))
+    total_baseline = sum(result[2] for result in results)
+    total_candidate = sum(result[3] for result in results)
+    print('%-14s %6s %12.3f %12.3f %7.1fx' % (
+        'total', '', total_baseline * 1000, total_candidate * 1000,
+        total_baseline / total_candidate))
+    print('')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--fonts-dir',
+                        help="folder with the .tfm files instead of kpsewhich")
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    reader_results = []
+    kern_results = []
+    for font_name in FONTS:
+        if args.fonts_dir:
+            font_path = os.path.join(args.fonts_dir, font_name)
+        else:
+            font_path = find_font_path(font_name)
+        tfm = parse_tfm.read_tfm_file(font_path)
+        chars = len(tfm.char_info)
+
+        if (get_tables(tfm) !=
+                get_tables(parse_tfm.read_tfm_file_by_byte(font_path))):
+            raise RuntimeError("Tables differ for %s" % font_name)
+        if scan_all(tfm) != lookup_all(font_path):
+            raise RuntimeError("Kern tables differ for %s" % font_name)
+
+        by_byte = min(timeit.repeat(
+            lambda: parse_tfm.read_tfm_file_by_byte(font_path),
+            number=1, repeat=args.repeat))
+        bulk = min(timeit.repeat(
+            lambda: parse_tfm.read_tfm_file(font_path),
+            number=1, repeat=args.repeat))
+        reader_results.append((font_name, chars, by_byte, bulk))
+
+        # The index is timed with the parsing that builds it, the scan
+        # without, so the comparison is conservative
+        scan = min(timeit.repeat(
+            lambda: scan_all(tfm), number=1, repeat=args.repeat))
+        index = min(timeit.repeat(
+            lambda: lookup_all(font_path), number=1, repeat=args.repeat))
+        kern_results.append((font_name, chars, scan, index))
+
+    print_results('reader', 'by byte', 'bulk', reader_results)
+    print_results('kerns', 'scan', 'index', kern_results)
+
+
+if __name__ == '__main__':
+    main()
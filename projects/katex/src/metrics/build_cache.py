@@ -0,0 +1,85 @@
+"""Per-family cache of the metrics pipeline stages.
+
+Each stage of buildMetrics.sh stores the metrics it computed for a family
+together with a fingerprint of everything they were computed from (the
+family's part of the input, the font files it reads and the source of the
+stage). On the next run, families whose fingerprint did not change are taken
+from the cache and only the dirty ones are computed again.
+
+The cache is enabled with --cache-dir or the METRICS_CACHE_DIR environment
+variable, and holds one JSON file per stage.
+"""
+
+import hashlib
+import json
+import os
+import sys
+
+
+def hash_file(path):
+    """Return the SHA-256 of a file content."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fingerprint(*parts):
+    """Return the SHA-256 of JSON serializable parts."""
+    serialized = json.dumps(parts, separators=(',', ':'), sort_keys=True)
+    return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+
+
+def hash_sources(*paths):
+    """Fingerprint the source files computing the metrics."""
+    return fingerprint(*[hash_file(path) for path in paths])
+
+
+class BuildCache(object):
+    def __init__(self, cache_dir, stage):
+        self.path = os.path.join(cache_dir, stage + '.json')
+        self.stage = stage
+        self.hits = 0
+        self.misses = 0
+        self.entries = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.entries = json.load(f)
+
+    def get(self, family, family_fingerprint):
+        """Return the cached metrics of a family, or None if it is dirty."""
+        entry = self.entries.get(family)
+        if entry is None or entry['fingerprint'] != family_fingerprint:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry['metrics']
+
+    def put(self, family, family_fingerprint, metrics):
+        self.entries[family] = {
+            'fingerprint': family_fingerprint,
+            'metrics': metrics,
+        }
+
+    def save(self, families):
+        """Write the entries of the given families, dropping the others."""
+        self.entries = dict((family, self.entries[family])
+                            for family in families
+                            if family in self.entries)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temporary_path = '%s.%d.tmp' % (self.path, os.getpid())
+        with open(temporary_path, 'w') as f:
+            json.dump(self.entries, f, separators=(',', ':'), sort_keys=True)
+        os.replace(temporary_path, self.path)
+
+        sys.stderr.write('%s: %d families reused, %d recomputed\n' %
+                         (self.stage, self.hits, self.misses))
+
+
+def open_cache(cache_dir, stage):
+    """Return the cache of a stage, or None when caching is disabled."""
+    cache_dir = cache_dir or os.environ.get('METRICS_CACHE_DIR')
+    if not cache_dir:
+        return None
+    return BuildCache(cache_dir, stage)
@@ -1,10 +1,35 @@
 #!/usr/bin/env python3
 
+import argparse
+import build_cache
 import collections
 import json
+import os
 import parse_tfm
 import subprocess
 import sys
+from concurrent.futures import ProcessPoolExecutor
+
+
+FONTS = [
+    'cmbsy10.tfm',
+    'cmbx10.tfm',
+    'cmbxti10.tfm',
+    'cmex10.tfm',
+    'cmmi10.tfm',
+    'cmmib10.tfm',
+    'cmr10.tfm',
+    'cmsy10.tfm',
+    'cmti10.tfm',
+    'msam10.tfm',
+    'msbm10.tfm',
+    'eufm10.tfm',
+    'cmtt10.tfm',
+    'rsfs10.tfm',
+    'cmss10.tfm',
+    'cmssbx10.tfm',
+    'cmssi10.tfm',
+]
 
 
 def find_font_path(font_name):
@@ -18,94 +43,193 @@ def find_font_path(font_name):
     return font_path.strip()
 
 
+# Extracted by running `\font\a=<font>` and then `\showthe\skewchar\a` in
+# TeX, where `<font>` is the name of the font listed here. The skewchar
+# will be printed out in the output. If it outputs `-1`, that means there
+# is no skewchar, so we use `None` here.
+FONT_SKEWCHAR = {
+    'cmbsy10': None,
+    'cmbx10': None,
+    'cmbxti10': None,
+    'cmex10': None,
+    'cmmi10': 127,
+    'cmmib10': None,
+    'cmr10': None,
+    'cmsy10': 48,
+    'cmti10': None,
+    'msam10': None,
+    'msbm10': None,
+    'eufm10': None,
+    'cmtt10': None,
+    'rsfs10': None,
+    'cmss10': None,
+    'cmssbx10': None,
+    'cmssi10': None,
+}
+
+# Parsed fonts of the process, set by init_worker in the pool workers
+font_name_to_tfm = {}
+
+
+def find_font_paths(font_names):
+    """Resolve all the font names with a single kpsewhich call."""
+    try:
+        output = subprocess.check_output(['kpsewhich'] + list(font_names))
+    except OSError:
+        raise RuntimeError("Couldn't find kpsewhich program, make sure you" +
+                           " have TeX installed")
+    except subprocess.CalledProcessError as e:
+        # kpsewhich exits with 1 when any name is missing, but still prints
+        # the paths it found
+        output = e.output
+
+    font_paths = {}
+    for line in output.splitlines():
+        font_path = line.strip()
+        font_name = os.path.basename(font_path).decode()
+        font_paths.setdefault(font_name, font_path)
+
+    missing = [font_name for font_name in font_names
+               if font_name not in font_paths]
+    if missing:
+        raise RuntimeError("Couldn't find font metrics: '%s'" %
+                           "', '".join(missing))
+    return [font_paths[font_name] for font_name in font_names]
+
+
+def init_worker(tfms):
+    font_name_to_tfm.update(tfms)
+
+
+def extract_family(family, chars):
+    """Return the metrics of the characters of a family."""
+    metrics = {}
+    for char, char_data in chars.items():
+        char_num = int(char)
+
+        font = char_data['font']
+        tex_char_num = int(char_data['char'])
+        yshift = float(char_data['yshift'])
+
+        if family == "Script-Regular":
+            tfm_char = font_name_to_tfm[font].get_char_metrics(tex_char_num,
+                                                               fix_rsfs=True)
+        else:
+            tfm_char = font_name_to_tfm[font].get_char_metrics(tex_char_num)
+
+        height = round(tfm_char.height + yshift / 1000.0, 5)
+        depth = round(tfm_char.depth - yshift / 1000.0, 5)
+        italic = round(tfm_char.italic_correction, 5)
+        width = round(tfm_char.width, 5)
+
+        skewkern = 0.0
+        if (FONT_SKEWCHAR[font] and
+                FONT_SKEWCHAR[font] in tfm_char.kern_table):
+            skewkern = round(
+                tfm_char.kern_table[FONT_SKEWCHAR[font]], 5)
+
+        metrics[char_num] = {
+            'height': height,
+            'depth': depth,
+            'italic': italic,
+            'skew': skewkern,
+            'width': width
+        }
+    return family, metrics
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Extract the TFM metrics of the glyph mapping on stdin.")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="processes parsing fonts and families "
+                             "(1 runs everything in this process)")
+    parser.add_argument('--cache-dir',
+                        help="reuse the metrics of unchanged families "
+                             "(default: METRICS_CACHE_DIR, disabled if unset)")
+    return parser.parse_args()
+
+
+def get_family_fingerprints(mapping, font_paths, source_hash):
+    """Fingerprint each family by its mapping and the TFM files it reads."""
+    font_hashes = {}
+    fingerprints = {}
+    for family, chars in mapping.items():
+        fonts = {}
+        for char_data in chars.values():
+            font = char_data['font']
+            if font not in font_hashes:
+                font_hashes[font] = build_cache.hash_file(font_paths[font])
+            fonts[font] = font_hashes[font]
+        fingerprints[family] = build_cache.fingerprint(
+            source_hash, family, chars, fonts)
+    return fingerprints
+
+
+def extract_families(mapping, font_paths, workers):
+    """Extract the metrics of the families of mapping, parsing their fonts."""
+    font_basenames = sorted(set(char_data['font']
+                                for chars in mapping.values()
+                                for char_data in chars.values()))
+    paths = [font_paths[font] for font in font_basenames]
+
+    if workers <= 1:
+        init_worker(zip(font_basenames, map(parse_tfm.read_tfm_file, paths)))
+        return [extract_family(family, chars)
+                for family, chars in mapping.items()]
+
+    with ProcessPoolExecutor(workers) as executor:
+        tfms = dict(zip(font_basenames,
+                        executor.map(parse_tfm.read_tfm_file, paths)))
+
+    # Each worker gets the parsed fonts once, then the families are spread
+    # across the workers
+    with ProcessPoolExecutor(workers, initializer=init_worker,
+                             initargs=(tfms,)) as executor:
+        return list(executor.map(extract_family, mapping.keys(),
+                                 mapping.values()))
+
+
 def main():
+    args = parse_arguments()
     mapping = json.load(sys.stdin)
-
-    fonts = [
-        'cmbsy10.tfm',
-        'cmbx10.tfm',
-        'cmbxti10.tfm',
-        'cmex10.tfm',
-        'cmmi10.tfm',
-        'cmmib10.tfm',
-        'cmr10.tfm',
-        'cmsy10.tfm',
-        'cmti10.tfm',
-        'msam10.tfm',
-        'msbm10.tfm',
-        'eufm10.tfm',
-        'cmtt10.tfm',
-        'rsfs10.tfm',
-        'cmss10.tfm',
-        'cmssbx10.tfm',
-        'cmssi10.tfm',
-    ]
-
-    # Extracted by running `\font\a=<font>` and then `\showthe\skewchar\a` in
-    # TeX, where `<font>` is the name of the font listed here. The skewchar
-    # will be printed out in the output. If it outputs `-1`, that means there
-    # is no skewchar, so we use `None` here.
-    font_skewchar = {
-        'cmbsy10': None,
-        'cmbx10': None,
-        'cmbxti10': None,
-        'cmex10': None,
-        'cmmi10': 127,
-        'cmmib10': None,
-        'cmr10': None,
-        'cmsy10': 48,
-        'cmti10': None,
-        'msam10': None,
-        'msbm10': None,
-        'eufm10': None,
-        'cmtt10': None,
-        'rsfs10': None,
-        'cmss10': None,
-        'cmssbx10': None,
-        'cmssi10': None,
-    }
-
-    font_name_to_tfm = {}
-
-    for font_name in fonts:
-        font_basename = font_name.split('.')[0]
-        font_path = find_font_path(font_name)
-        font_name_to_tfm[font_basename] = parse_tfm.read_tfm_file(font_path)
+    cache = build_cache.open_cache(args.cache_dir, 'extract_tfms')
+
+    font_paths = dict(zip([font_name.split('.')[0] for font_name in FONTS],
+                          find_font_paths(FONTS)))
+
+    cached = {}
+    dirty_mapping = mapping
+    if cache is not None:
+        source_hash = build_cache.hash_sources(__file__, parse_tfm.__file__)
+        fingerprints = get_family_fingerprints(mapping, font_paths,
+                                               source_hash)
+        dirty_mapping = {}
+        for family, chars in mapping.items():
+            metrics = cache.get(family, fingerprints[family])
+            if metrics is None:
+                dirty_mapping[family] = chars
+            else:
+                # JSON turned the code points into strings
+                cached[family] = dict((int(char_num), char_metrics)
+                                      for char_num, char_metrics
+                                      in metrics.items())
+
+    results = dict(extract_families(dirty_mapping, font_paths, args.workers)
+                   if dirty_mapping else [])
+    if cache is not None:
+        for family, metrics in results.items():
+            cache.put(family, fingerprints[family], metrics)
+        cache.save(mapping.keys())
 
     families = collections.defaultdict(dict)
 
-    for family, chars in mapping.items():
-        for char, char_data in chars.items():
-            char_num = int(char)
-
-            font = char_data['font']
-            tex_char_num = int(char_data['char'])
-            yshift = float(char_data['yshift'])
-
-            if family == "Script-Regular":
-                tfm_char = font_name_to_tfm[font].get_char_metrics(tex_char_num,
-                                                                   fix_rsfs=True)
-            else:
-                tfm_char = font_name_to_tfm[font].get_char_metrics(tex_char_num)
-
-            height = round(tfm_char.height + yshift / 1000.0, 5)
-            depth = round(tfm_char.depth - yshift / 1000.0, 5)
-            italic = round(tfm_char.italic_correction, 5)
-            width = round(tfm_char.width, 5)
-
-            skewkern = 0.0
-            if (font_skewchar[font] and
-                    font_skewchar[font] in tfm_char.kern_table):
-                skewkern = round(
-                    tfm_char.kern_table[font_skewchar[font]], 5)
-
-            families[family][char_num] = {
-                'height': height,
-                'depth': depth,
-                'italic': italic,
-                'skew': skewkern,
-                'width': width
-            }
+    # Merged in the order of the mapping, so the output does not depend on
+    # which worker finished first
+    for family in mapping:
+        metrics = cached[family] if family in cached else results[family]
+        if metrics:
+            families[family].update(metrics)
 
     sys.stdout.write(
         json.dumps(families, separators=(',', ':'), sort_keys=True))
@@ -1,7 +1,13 @@
 #!/usr/bin/env python3
 
+from concurrent.futures import ProcessPoolExecutor
 from fontTools.ttLib import TTFont
+import argparse
+import build_cache
+import os
+import struct
 import sys
+import time
 import json
 
 # map of characters to extract
@@ -58,62 +64,160 @@ metrics_to_extract = {
 }
 
 
+# numberOfContours, xMin (skipped), yMin, xMax (skipped), yMax
+GLYPH_HEADER = struct.Struct(">h2xh2xh")
+
+
+def get_font_path(font):
+    return "../../fonts/KaTeX_" + font + ".ttf"
+
+
+def get_unicode_names(fontInfo, codes):
+    """Merge the Unicode cmaps into {code: set of glyph names} for codes.
+
+    We keep ALL Unicode cmaps, not just fontInfo["cmap"].getcmap(3, 1).
+    This is playing it extra safe, since it reports inconsistencies.
+    Platform 0 is Unicode, platform 3 is Windows. For platform 3,
+    encoding 1 is UCS-2 and encoding 10 is UCS-4. A subtable without a code
+    adds None, like a missing name. The other subtables are not decompiled.
+    """
+    cmap = [t.cmap for t in fontInfo["cmap"].tables
+            if (t.platformID == 0)
+            or (t.platformID == 3 and t.platEncID in (1, 10))]
+    return dict((code, set(t.get(code) for t in cmap)) for code in codes)
+
+
+def get_glyph_bounds(fontInfo, name):
+    """Return the numberOfContours, yMin and yMax of a glyph.
+
+    They are read from the header of the glyph in the raw glyf table, so the
+    other glyphs are never split nor decompiled.
+    """
+    glyph_id = fontInfo.getGlyphID(name)
+    start, end = fontInfo["loca"][glyph_id], fontInfo["loca"][glyph_id + 1]
+    if start == end:
+        return 0, 0, 0
+    numberOfContours, yMin, yMax = GLYPH_HEADER.unpack_from(
+        fontInfo.reader["glyf"], start)
+    return numberOfContours, yMin, yMax
+
+
+def extract_font(font, font_metrics):
+    """Add the metrics read from the TTF of a font to its TFM metrics.
+
+    The font is opened lazily, so only the glyf headers, hmtx widths and
+    Unicode cmap subtables of the requested characters are decoded.
+    """
+    fontInfo = TTFont(get_font_path(font), lazy=True)
+    hmtx = fontInfo["hmtx"]
+    unitsPerEm = float(fontInfo["head"].unitsPerEm)
+
+    chars = metrics_to_extract.get(font, {})
+    chars[u"\u0020"] = None  # space
+    chars[u"\u00a0"] = None  # nbsp
+
+    unicode_names = get_unicode_names(
+        fontInfo, [ord(char) for char in chars])
+
+    for char, base_char in chars.items():
+        code = ord(char)
+        names = set(unicode_names[code])
+        if not names:
+            sys.stderr.write(
+                "Codepoint {} of font {} maps to no name\n"
+                .format(code, font))
+            continue
+        if len(names) != 1:
+            sys.stderr.write(
+                "Codepoint {} of font {} maps to multiple names: {}\n"
+                .format(code, font, ", ".join(sorted(names))))
+            continue
+        name = names.pop()
+
+        height = depth = italic = skew = width = 0
+        numberOfContours, yMin, yMax = get_glyph_bounds(fontInfo, name)
+        if numberOfContours:
+            height = yMax / unitsPerEm
+            depth = -yMin / unitsPerEm
+        width = hmtx[name][0] / unitsPerEm
+        if base_char:
+            base_char_str = str(ord(base_char))
+            base_metrics = font_metrics[base_char_str]
+            italic = base_metrics["italic"]
+            skew = base_metrics["skew"]
+            width = base_metrics["width"]
+
+        font_metrics[str(code)] = {
+            "height": height,
+            "depth": depth,
+            "italic": italic,
+            "skew": skew,
+            "width": width
+        }
+    fontInfo.close()
+    return font_metrics
+
+
+def extract_font_timed(font, font_metrics):
+    start = time.perf_counter()
+    font_metrics = extract_font(font, font_metrics)
+    return font, font_metrics, time.perf_counter() - start
+
+
 def main():
+    parser = argparse.ArgumentParser(
+        description="Add the metrics read from the KaTeX TTFs.")
+    parser.add_argument('--cache-dir',
+                        help="reuse the metrics of unchanged fonts "
+                             "(default: METRICS_CACHE_DIR, disabled if unset)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="processes reading fonts "
+                             "(1 reads them in this process)")
+    parser.add_argument('--timings', action='store_true',
+                        help="print the time spent on each font to stderr")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
     start_json = json.load(sys.stdin)
+    cache = build_cache.open_cache(args.cache_dir, 'extract_ttfs')
+
+    dirty_fonts = list(start_json)
+    fingerprints = {}
+    if cache is not None:
+        source_hash = build_cache.hash_sources(__file__)
+        dirty_fonts = []
+        for font in start_json:
+            fingerprints[font] = build_cache.fingerprint(
+                source_hash, font, start_json[font],
+                build_cache.hash_file(get_font_path(font)))
+            font_metrics = cache.get(font, fingerprints[font])
+            if font_metrics is None:
+                dirty_fonts.append(font)
+            else:
+                start_json[font] = font_metrics
+
+    dirty_metrics = [start_json[font] for font in dirty_fonts]
+    if args.workers <= 1 or len(dirty_fonts) <= 1:
+        results = list(map(extract_font_timed, dirty_fonts, dirty_metrics))
+    else:
+        with ProcessPoolExecutor(args.workers) as executor:
+            results = list(executor.map(extract_font_timed, dirty_fonts,
+                                        dirty_metrics))
+
+    for font, font_metrics, seconds in results:
+        start_json[font] = font_metrics
+        if cache is not None:
+            cache.put(font, fingerprints[font], font_metrics)
+        if args.timings:
+            sys.stderr.write("{:<24} {:8.1f} ms\n".format(
+                font, seconds * 1000))
 
-    for font in start_json:
-        fontInfo = TTFont("../../fonts/KaTeX_" + font + ".ttf")
-        glyf = fontInfo["glyf"]
-        widths = fontInfo.getGlyphSet()
-        unitsPerEm = float(fontInfo["head"].unitsPerEm)
-
-        # We keep ALL Unicode cmaps, not just fontInfo["cmap"].getcmap(3, 1).
-        # This is playing it extra safe, since it reports inconsistencies.
-        # Platform 0 is Unicode, platform 3 is Windows. For platform 3,
-        # encoding 1 is UCS-2 and encoding 10 is UCS-4.
-        cmap = [t.cmap for t in fontInfo["cmap"].tables
-                if (t.platformID == 0)
-                or (t.platformID == 3 and t.platEncID in (1, 10))]
-
-        chars = metrics_to_extract.get(font, {})
-        chars[u"\u0020"] = None  # space
-        chars[u"\u00a0"] = None  # nbsp
-
-        for char, base_char in chars.items():
-            code = ord(char)
-            names = set(t.get(code) for t in cmap)
-            if not names:
-                sys.stderr.write(
-                    "Codepoint {} of font {} maps to no name\n"
-                    .format(code, font))
-                continue
-            if len(names) != 1:
-                sys.stderr.write(
-                    "Codepoint {} of font {} maps to multiple names: {}\n"
-                    .format(code, font, ", ".join(sorted(names))))
-                continue
-            name = names.pop()
-
-            height = depth = italic = skew = width = 0
-            glyph = glyf[name]
-            if glyph.numberOfContours:
-                height = glyph.yMax / unitsPerEm
-                depth = -glyph.yMin / unitsPerEm
-            width = widths[name].width / unitsPerEm
-            if base_char:
-                base_char_str = str(ord(base_char))
-                base_metrics = start_json[font][base_char_str]
-                italic = base_metrics["italic"]
-                skew = base_metrics["skew"]
-                width = base_metrics["width"]
-
-            start_json[font][str(code)] = {
-                "height": height,
-                "depth": depth,
-                "italic": italic,
-                "skew": skew,
-                "width": width
-            }
+    if cache is not None:
+        cache.save(start_json.keys())
+    if args.timings:
+        sys.stderr.write("{:<24} {:8.1f} ms ({} fonts, {} workers)\n".format(
+            "total", (time.perf_counter() - start) * 1000,
+            len(dirty_fonts), args.workers))
 
     sys.stdout.write(
         json.dumps(start_json, separators=(',', ':'), sort_keys=True))
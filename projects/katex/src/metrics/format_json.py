@@ -1,28 +1,86 @@
 #!/usr/bin/env python3
 
-import sys
+import argparse
 import json
+import sys
+
+HEADER = "// This file is GENERATED by buildMetrics.sh. DO NOT MODIFY.\n"
+
+# Builds the same {font: {code point: [depth, height, ...]}} map as the object
+# literal, with each glyph a view on the Float64Array table of its font
+UNPACK_TYPED = """\
+const metricMap = {};
+for (const font in fonts) {
+    const codePoints = fonts[font][0];
+    const table = new Float64Array(fonts[font][1]);
+    const glyphs = metricMap[font] = {};
+    for (let i = 0; i < codePoints.length; i++) {
+        glyphs[codePoints[i]] = table.subarray(i * %d, (i + 1) * %d);
+    }
+}
+export default metricMap;
+"""
+
+
+def format_number(value):
+    """Format a metric like json.dumps, with 0.0 written as 0."""
+    if value == 0.0:
+        return "0"
+    return repr(value)
+
+
+def get_values(glyph_metrics, props):
+    return ", ".join([format_number(glyph_metrics[key]) for key in props])
 
-props = ['depth', 'height', 'italic', 'skew']
 
-if len(sys.argv) > 1:
-    if sys.argv[1] == '--width':
+def format_object(data, props):
+    """Yield the chunks of the object literal module, one per font."""
+    yield HEADER + "export default {\n"
+    for font in sorted(data):
+        glyphs = data[font]
+        lines = ['        "%s": [%s],\n' % (glyph, get_values(glyphs[glyph],
+                                                             props))
+                 for glyph in sorted(glyphs, key=int)]
+        yield '    %s: {\n%s    },\n' % (json.dumps(font), "".join(lines))
+    yield "};\n"
+
+
+def format_typed(data, props):
+    """Yield the chunks of a module with one code point list and one flat
+    table of metrics per font."""
+    yield HEADER + "const fonts = {\n"
+    for font in sorted(data):
+        glyphs = data[font]
+        code_points = sorted(glyphs, key=int)
+        yield '    %s: [\n        [%s],\n        [%s],\n    ],\n' % (
+            json.dumps(font), ",".join(code_points),
+            ",".join([get_values(glyphs[glyph], props).replace(" ", "")
+                      for glyph in code_points]))
+    yield "};\n" + UNPACK_TYPED % (len(props), len(props))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Format the font metrics on stdin as fontMetricsData.js.")
+    parser.add_argument('--width', action='store_true',
+                        help="include the width of the glyphs")
+    parser.add_argument('--typed', action='store_true',
+                        help="emit a code point list and a Float64Array "
+                             "table per font instead of an object literal")
+    args = parser.parse_args()
+
+    props = ['depth', 'height', 'italic', 'skew']
+    if args.width:
         props.append('width')
 
-data = json.load(sys.stdin)
-sys.stdout.write(
-  "// This file is GENERATED by buildMetrics.sh. DO NOT MODIFY.\n")
-sep = "export default {\n    "
-for font in sorted(data):
-    sys.stdout.write(sep + json.dumps(font))
-    sep = ": {\n        "
-    for glyph in sorted(data[font], key=int):
-        sys.stdout.write(sep + json.dumps(glyph) + ": ")
-
-        values = [value if value != 0.0 else 0 for value in
-                  [data[font][glyph][key] for key in props]]
-
-        sys.stdout.write(json.dumps(values))
-        sep = ",\n        "
-    sep = ",\n    },\n    "
-sys.stdout.write(",\n    },\n};\n")
+    data = json.load(sys.stdin)
+    chunks = (format_typed if args.typed else format_object)(data, props)
+
+    # One write of the encoded text per font on the buffered binary stdout
+    out = sys.stdout.buffer
+    for chunk in chunks:
+        out.write(chunk.encode('utf-8'))
+    out.flush()
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,21 @@
+import struct
+from array import array
+
+
+# A fix_word is a signed 32-bit integer scaled by 2^20
+FIXWORD_SCALE = float(1 << 20)
+
+
+def as_float_array(values):
+    if isinstance(values, array) and values.typecode == 'd':
+        return values
+    return array('d', values)
+
+
 class CharInfoWord(object):
+    __slots__ = ('width_index', 'height_index', 'depth_index',
+                 'italic_index', 'tag', 'remainder')
+
     def __init__(self, word):
         b1, b2, b3, b4 = (word >> 24,
                           (word & 0xff0000) >> 16,
@@ -19,15 +36,77 @@ class CharInfoWord(object):
         return self.remainder
 
 
+class CharInfoTable(object):
+    """The char_info words of a font decoded into parallel byte columns.
+
+    Indexing returns a CharInfoWord built on demand, so the table can be used
+    like the list of CharInfoWord it replaces.
+    """
+    __slots__ = ('width_index', 'height_index', 'depth_index',
+                 'italic_index', 'tag', 'remainder')
+
+    def __init__(self, data):
+        """Decode the 4 bytes per character of a char_info table."""
+        data = bytes(data)
+        self.width_index = array('B', data[0::4])
+        self.height_index = array('B', (b2 >> 4 for b2 in data[1::4]))
+        self.depth_index = array('B', (b2 & 0x0f for b2 in data[1::4]))
+        self.italic_index = array('B', (b3 >> 2 for b3 in data[2::4]))
+        self.tag = array('B', (b3 & 0b11 for b3 in data[2::4]))
+        self.remainder = array('B', data[3::4])
+
+    @classmethod
+    def from_words(cls, char_info):
+        """Build the table from a list of CharInfoWord."""
+        return cls(b''.join(struct.pack(
+            '>4B', info.width_index,
+            (info.height_index << 4) | info.depth_index,
+            (info.italic_index << 2) | info.tag, info.remainder)
+            for info in char_info))
+
+    def __len__(self):
+        return len(self.width_index)
+
+    def __getitem__(self, index):
+        return CharInfoWord(
+            (self.width_index[index] << 24) |
+            (((self.height_index[index] << 4) | self.depth_index[index])
+             << 16) |
+            (((self.italic_index[index] << 2) | self.tag[index]) << 8) |
+            self.remainder[index])
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
 class LigKernProgram(object):
+    """A lig/kern program packed as 4 bytes per instruction."""
+
     def __init__(self, program):
-        self.program = program
+        if isinstance(program, (bytes, bytearray, memoryview)):
+            self.data = bytes(program)
+        else:
+            self.data = b''.join(struct.pack('>4B', *instruction)
+                                 for instruction in program)
+        self.chains = {}
+
+    @property
+    def program(self):
+        """The instructions as (skip, next_char, op, remainder) tuples."""
+        return list(struct.iter_unpack('>4B', self.data))
+
+    def __len__(self):
+        return len(self.data) // 4
 
     def execute(self, start, next_char):
+        data = self.data
         curr_instruction = start
         while True:
-            instruction = self.program[curr_instruction]
-            (skip, inst_next_char, op, remainder) = instruction
+            position = 4 * curr_instruction
+            if position >= len(data):
+                raise IndexError("lig/kern instruction out of range")
+            (skip, inst_next_char, op, remainder) = data[position:position + 4]
 
             if inst_next_char == next_char:
                 if op < 128:
@@ -40,8 +119,38 @@ class LigKernProgram(object):
             else:
                 curr_instruction += 1 + skip
 
+    def chain_kerns(self, start):
+        """Return {next_char: kern index} for the chain beginning at start.
+
+        The chain is walked once and the first instruction for each next_char
+        wins, which gives the same result as calling execute for every
+        next_char. Ligatures map to None. Chains are memoized since several
+        characters can share one.
+        """
+        kerns = self.chains.get(start)
+        if kerns is not None:
+            return kerns
+
+        data = self.data
+        kerns = {}
+        position = 4 * start
+        while position < len(data):
+            (skip, inst_next_char, op, remainder) = data[position:position + 4]
+            if inst_next_char not in kerns:
+                kerns[inst_next_char] = (
+                    None if op < 128 else 256 * (op - 128) + remainder)
+            if skip >= 128:
+                break
+            position += 4 * (1 + skip)
+
+        self.chains[start] = kerns
+        return kerns
+
 
 class TfmCharMetrics(object):
+    __slots__ = ('width', 'height', 'depth', 'italic_correction',
+                 'kern_table')
+
     def __init__(self, width, height, depth, italic, kern_table):
         self.width = width
         self.height = height
@@ -51,18 +160,68 @@ class TfmCharMetrics(object):
 
 
 class TfmFile(object):
+    """The metrics of a font, stored in arrays.
+
+    char_info is a CharInfoTable, the dimension and kern tables are
+    array('d') and the lig/kern program is packed in a LigKernProgram. Lists
+    of CharInfoWord, floats and 4-tuples are accepted and converted.
+    """
+    __slots__ = ('start_char', 'end_char', 'char_info', 'width_table',
+                 'height_table', 'depth_table', 'italic_table',
+                 'ligkern_program', 'kern_table', 'kern_index',
+                 'metrics_cache')
+
     def __init__(self, start_char, end_char, char_info, width_table,
                  height_table, depth_table, italic_table, ligkern_table,
                  kern_table):
         self.start_char = start_char
         self.end_char = end_char
+        if not isinstance(char_info, CharInfoTable):
+            char_info = CharInfoTable.from_words(char_info)
         self.char_info = char_info
-        self.width_table = width_table
-        self.height_table = height_table
-        self.depth_table = depth_table
-        self.italic_table = italic_table
+        self.width_table = as_float_array(width_table)
+        self.height_table = as_float_array(height_table)
+        self.depth_table = as_float_array(depth_table)
+        self.italic_table = as_float_array(italic_table)
         self.ligkern_program = LigKernProgram(ligkern_table)
-        self.kern_table = kern_table
+        self.kern_table = as_float_array(kern_table)
+        self.kern_index = self.build_kern_index()
+        self.metrics_cache = {}
+
+    def build_kern_index(self):
+        """Decode the lig/kern program into {left_char: {right_char: kern}}.
+
+        left_char is the position in char_info offset by start_char. Only
+        right characters within start_char..end_char are kept, in increasing
+        order, like the per-character scan this replaces. Characters sharing
+        a lig/kern chain share the same row.
+        """
+        kern_index = {}
+        rows = {}
+        tags = self.char_info.tag
+        starts = self.char_info.remainder
+        for index in range(len(self.char_info)):
+            # A tag of 1 means the character has a lig/kern program
+            if tags[index] != 1:
+                continue
+            start = starts[index]
+            row = rows.get(start)
+            if row is None:
+                kerns = self.ligkern_program.chain_kerns(start)
+                row = rows[start] = dict(
+                    (char, self.kern_table[kerns[char]])
+                    for char in sorted(kerns)
+                    if self.start_char <= char <= self.end_char and
+                    kerns[char])
+            kern_index[self.start_char + index] = row
+
+        # The decoded chains are only needed to build the index
+        self.ligkern_program.chains.clear()
+        return kern_index
+
+    def get_kern(self, left_char, right_char):
+        """Return the kern between two characters, or None."""
+        return self.kern_index.get(left_char, {}).get(right_char)
 
     def get_char_metrics(self, char_num, fix_rsfs=False):
         """Return glyph metrics for a unicode code point.
@@ -70,29 +229,32 @@ class TfmFile(object):
         Arguments:
             char_num: a unicode code point
             fix_rsfs: adjust for rsfs10.tfm's different indexing system
+
+        The metrics are cached per (char_num, fix_rsfs), so callers share the
+        returned object and must not modify it.
         """
         if char_num < self.start_char or char_num > self.end_char:
             raise RuntimeError("Invalid character number")
 
+        metrics = self.metrics_cache.get((char_num, fix_rsfs))
+        if metrics is not None:
+            return metrics
+
         if fix_rsfs:
             # all of the char_nums contained start from zero in rsfs10.tfm
-            info = self.char_info[char_num - self.start_char]
+            index = char_num - self.start_char
         else:
-            info = self.char_info[char_num + self.start_char]
-
-        char_kern_table = {}
-        if info.has_ligkern():
-            for char in range(self.start_char, self.end_char + 1):
-                kern = self.ligkern_program.execute(info.ligkern_start(), char)
-                if kern:
-                    char_kern_table[char] = self.kern_table[kern]
+            index = char_num + self.start_char
+        char_info = self.char_info
 
-        return TfmCharMetrics(
-            self.width_table[info.width_index],
-            self.height_table[info.height_index],
-            self.depth_table[info.depth_index],
-            self.italic_table[info.italic_index],
-            char_kern_table)
+        metrics = TfmCharMetrics(
+            self.width_table[char_info.width_index[index]],
+            self.height_table[char_info.height_index[index]],
+            self.depth_table[char_info.depth_index[index]],
+            self.italic_table[char_info.italic_index[index]],
+            self.kern_index.get(self.start_char + index, {}))
+        self.metrics_cache[(char_num, fix_rsfs)] = metrics
+        return metrics
 
 
 class TfmReader(object):
@@ -130,7 +292,12 @@ class TfmReader(object):
         return data[:str_length]
 
 
-def read_tfm_file(file_name):
+def read_tfm_file_by_byte(file_name):
+    """Read a TFM file through TfmReader, one byte at a time.
+
+    This is the reference implementation of read_tfm_file, kept for
+    benchmark_tfm.py.
+    """
     with open(file_name, 'rb') as f:
         reader = TfmReader(f)
 
@@ -209,3 +376,53 @@ def read_tfm_file(file_name):
         return TfmFile(start_char, end_char, char_info, width_table,
                        height_table, depth_table, italic_table,
                        ligkern_table, kern_table)
+
+
+def read_fixwords(data, offset, count):
+    """Decode count big-endian fix_words starting at offset."""
+    words = struct.unpack_from('>%di' % count, data, offset)
+    return array('d', (word / FIXWORD_SCALE for word in words))
+
+
+def read_tfm_file(file_name):
+    """Read a TFM file, decoding each table in bulk from one read of the file."""
+    with open(file_name, 'rb') as f:
+        data = memoryview(f.read())
+
+    (_file_size, header_size, start_char, end_char,
+     width_table_size, height_table_size, depth_table_size,
+     italic_table_size, ligkern_table_size, kern_table_size,
+     _extensible_table_size, _parameter_table_size) = struct.unpack_from(
+        '>12H', data, 0)
+
+    # The header words (checksum, design size, coding scheme, family, ...)
+    # are not needed
+    offset = 24 + 4 * header_size
+
+    char_count = end_char - start_char + 1
+    char_info = CharInfoTable(data[offset:offset + 4 * char_count])
+    offset += 4 * char_count
+
+    width_table = read_fixwords(data, offset, width_table_size)
+    offset += 4 * width_table_size
+
+    height_table = read_fixwords(data, offset, height_table_size)
+    offset += 4 * height_table_size
+
+    depth_table = read_fixwords(data, offset, depth_table_size)
+    offset += 4 * depth_table_size
+
+    italic_table = read_fixwords(data, offset, italic_table_size)
+    offset += 4 * italic_table_size
+
+    ligkern_table = data[offset:offset + 4 * ligkern_table_size]
+    offset += 4 * ligkern_table_size
+
+    kern_table = read_fixwords(data, offset, kern_table_size)
+
+    # There is more information, like the extensible and param tables, but
+    # we don't need these for now
+
+    return TfmFile(start_char, end_char, char_info, width_table,
+                   height_table, depth_table, italic_table,
+                   ligkern_table, kern_table)
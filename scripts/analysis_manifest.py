@@ -0,0 +1,142 @@
+# ----------------------------------------------------------------------------------------
+# Manifest of the rows computed by check_smells.py. For every row of a Refactor dataset it
+# keeps a fingerprint of the row and of its inputs (the original and refactored smell CSVs
+# and test summaries of the sample) with the columns derived from them, so a rerun only
+# recomputes the rows whose inputs changed and takes the others from the manifest.
+#
+# Like the git index, the content hash of an input is only computed again when its size
+# or modification time changed, and a tool whose dataset, output and inputs all kept their
+# size and modification time is not read at all.
+# ----------------------------------------------------------------------------------------
+
+import os
+import json
+import sqlite3
+import hashlib
+from detection_cache import hash_file
+
+# Bump when the columns derived by check_smells.py change, to recompute every row
+MANIFEST_VERSION = 1
+
+# Size and modification time of a file that does not exist
+MISSING_STAT = (-1, -1)
+
+def get_stat(path):
+    """Return the size and modification time of a file, or MISSING_STAT."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return MISSING_STAT
+    return stat.st_size, stat.st_mtime_ns
+
+class AnalysisManifest:
+    """SQLite backed record of the inputs and derived columns of the Refactor dataset rows."""
+
+    def __init__(self, path):
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+
+        self.path = path
+        self.seen = {}
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS files ('
+            'path TEXT PRIMARY KEY, '
+            'tool TEXT NOT NULL, '
+            'size INTEGER NOT NULL, '
+            'mtime_ns INTEGER NOT NULL, '
+            'content_hash TEXT NOT NULL)'
+        )
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS rows ('
+            'tool TEXT NOT NULL, '
+            'smell_id INTEGER NOT NULL, '
+            'fingerprint TEXT NOT NULL, '
+            'columns TEXT NOT NULL, '
+            'PRIMARY KEY (tool, smell_id))'
+        )
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS outputs ('
+            'tool TEXT PRIMARY KEY, '
+            'version INTEGER NOT NULL, '
+            'dataset_stat TEXT NOT NULL, '
+            'output_stat TEXT NOT NULL)'
+        )
+        self.connection.commit()
+
+    def hash_input(self, tool, path):
+        """Return the content hash of an input of a tool ('' when it is missing), hashing it only when its stat changed."""
+        self.seen.setdefault(tool, set()).add(path)
+        size, mtime_ns = get_stat(path)
+        entry = self.connection.execute(
+            'SELECT size, mtime_ns, content_hash FROM files WHERE path = ?', (path,)
+        ).fetchone()
+        if entry is not None and entry[:2] == (size, mtime_ns):
+            return entry[2]
+
+        content_hash = hash_file(path) if (size, mtime_ns) != MISSING_STAT else ''
+        self.connection.execute(
+            'INSERT OR REPLACE INTO files (path, tool, size, mtime_ns, content_hash) VALUES (?, ?, ?, ?, ?)',
+            (path, tool, size, mtime_ns, content_hash)
+        )
+        return content_hash
+
+    @staticmethod
+    def make_fingerprint(row_values, input_hashes):
+        """Return the fingerprint of a dataset row and the hashes of its inputs."""
+        digest = hashlib.sha256()
+        digest.update(json.dumps([MANIFEST_VERSION, input_hashes], default=str).encode('utf-8'))
+        digest.update(json.dumps(row_values, default=str).encode('utf-8'))
+        return digest.hexdigest()
+
+    def is_up_to_date(self, tool, dataset_path, output_path):
+        """Check that the dataset, the output and every input of a tool kept the size and time recorded with the output."""
+        entry = self.connection.execute(
+            'SELECT version, dataset_stat, output_stat FROM outputs WHERE tool = ?', (tool,)
+        ).fetchone()
+        if entry is None or entry[0] != MANIFEST_VERSION:
+            return False
+        if json.loads(entry[1]) != list(get_stat(dataset_path)) or json.loads(entry[2]) != list(get_stat(output_path)):
+            return False
+        for path, size, mtime_ns in self.connection.execute(
+            'SELECT path, size, mtime_ns FROM files WHERE tool = ?', (tool,)
+        ):
+            if get_stat(path) != (size, mtime_ns):
+                return False
+        return True
+
+    def get_rows(self, tool):
+        """Return {smell_id: (fingerprint, derived columns)} for the rows of a tool."""
+        return dict(
+            (smell_id, (fingerprint, json.loads(columns)))
+            for smell_id, fingerprint, columns in self.connection.execute(
+                'SELECT smell_id, fingerprint, columns FROM rows WHERE tool = ?', (tool,)
+            )
+        )
+
+    def put_rows(self, tool, rows):
+        """Replace the rows of a tool with {smell_id: (fingerprint, derived columns)}."""
+        self.connection.execute('DELETE FROM rows WHERE tool = ?', (tool,))
+        self.connection.executemany(
+            'INSERT INTO rows (tool, smell_id, fingerprint, columns) VALUES (?, ?, ?, ?)',
+            [(tool, int(smell_id), fingerprint, json.dumps(columns, default=str))
+             for smell_id, (fingerprint, columns) in rows.items()]
+        )
+
+    def put_output(self, tool, dataset_path, output_path):
+        """Record the dataset and output just written for a tool and forget the inputs it no longer uses."""
+        seen = self.seen.get(tool, set())
+        stale_paths = [
+            (path,) for (path,) in self.connection.execute('SELECT path FROM files WHERE tool = ?', (tool,))
+            if path not in seen
+        ]
+        self.connection.executemany('DELETE FROM files WHERE path = ?', stale_paths)
+        self.connection.execute(
+            'INSERT OR REPLACE INTO outputs (tool, version, dataset_stat, output_stat) VALUES (?, ?, ?, ?)',
+            (tool, MANIFEST_VERSION, json.dumps(get_stat(dataset_path)), json.dumps(get_stat(output_path)))
+        )
+        self.connection.commit()
+
+    def close(self):
+        """Close the connection to the manifest."""
+        self.connection.close()
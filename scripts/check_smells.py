@@ -1,6 +1,36 @@
 import pandas as pd
 import os
 import re
+import sys
+import time
+import argparse
+from dotenv import load_dotenv
+from results_store import ResultsStore, DEFAULT_STORE_PATH
+from jest_summary import SUMMARY_FILES, JestSummary, parse_summary_file, parse_summary_text
+from analysis_manifest import AnalysisManifest
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Root of the research repository (refactoring_data/ and scripts/assets/)
+REPOSITORY_PATH = os.getenv(
+    "PATH_TO_REPOSITORY",
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
+# Folder name in refactoring_data/ -> suffix used by the Refactor dataset files
+TOOLS = {"copilot": "Copilot", "whisper": "Whisperer"}
+
+# Each sample is detected twice: before and after the LLM refactoring
+SMELL_SIDES = ["original", "refactored"]
+
+# Default location of the manifest of the rows computed by previous runs
+DEFAULT_MANIFEST_PATH = os.path.join(REPOSITORY_PATH, "scripts", ".check_smells_manifest.sqlite")
+
+# Columns set for every row, and for the rows whose sample has both smell CSVs
+SMELL_CHANGE_COLUMNS = ["Removed smell", "Added new smell", "Smell added"]
+TEST_RESULT_COLUMNS = ["Test before", "Test after", "Coverage before", "Coverage after",
+                       "Test results changed", "Coverage changed"]
 
 def load_data(refactor_dataset_path, original_smells_path, refactored_smells_path):
     """Load the CSV files."""
@@ -23,84 +53,6 @@ def is_smell_added(original_count, refactored_count):
     """Check if a smell was added."""
     return refactored_count > original_count
 
-def read_test_summary(file_path):
-    """Read the test summary CSV file."""
-    try:
-        with open(file_path, 'r') as file:
-            lines = file.readlines()
-            # Extract the test summary section
-            # get the line 2 until 5
-            test_summary = ''.join(lines[1:5]).strip() 
-            return test_summary
-    except FileNotFoundError:
-        print(f"Test summary file not found: {file_path}")
-        return None
-        
-
-def parse_test_summary(test_summary):
-    """Parse the test summary to extract passed and failed test counts."""
-    if not test_summary:
-        return {"passed": 0, "failed": 0}
-
-    passed = 0
-    failed = 0
-
-    # Find all "X passed" and "Y failed" for both Test Suites and Tests
-    for match in re.finditer(r"(Test Suites|Tests):([^\n]+)", test_summary):
-        line = match.group(2)
-        passed_match = re.search(r"(\d+)\s*passed", line)
-        failed_match = re.search(r"(\d+)\s*failed", line)
-        if passed_match:
-            passed += int(passed_match.group(1))
-        if failed_match:
-            failed += int(failed_match.group(1))
-
-    return {"passed": passed, "failed": failed}
-
-def test_results_changed(original_summary, refactored_summary):
-    """Check if the test results have changed."""
-    original_results = parse_test_summary(original_summary)
-    refactored_results = parse_test_summary(refactored_summary)
-
-    # Compare the number of passed tests
-    return original_results["passed"] != refactored_results["passed"]
-
-def parse_coverage_summary(coverage_summary):
-    """Parse the coverage summary to extract coverage metrics."""
-    if not coverage_summary:
-        return {"Statements": 0.0, "Branches": 0.0, "Functions": 0.0, "Lines": 0.0}
-
-    # Use regex to extract coverage metrics
-    coverage_metrics = {
-        "Statements": float(re.search(r"Statements\s*:\s*([\d.]+)%", coverage_summary).group(1)),
-        "Branches": float(re.search(r"Branches\s*:\s*([\d.]+)%", coverage_summary).group(1)),
-        "Functions": float(re.search(r"Functions\s*:\s*([\d.]+)%", coverage_summary).group(1)),
-        "Lines": float(re.search(r"Lines\s*:\s*([\d.]+)%", coverage_summary).group(1)),
-    }
-    return coverage_metrics
-
-def coverage_results_changed(original_summary, refactored_summary):
-    """Check if the coverage results have changed."""
-    original_coverage = parse_coverage_summary(original_summary)
-    refactored_coverage = parse_coverage_summary(refactored_summary)
-
-    # Compare each coverage metric
-    return original_coverage != refactored_coverage
-
-
-def read_coverage_summary(file_path):
-    """Read the coverage summary CSV file."""
-    try:
-        with open(file_path, 'r') as file:
-            lines = file.readlines()
-            # Extract the coverage summary section
-            # get the line 8 until 12
-            coverage_summary = ''.join(lines[8:12])
-            return coverage_summary
-    except FileNotFoundError:
-        print(f"Test summary file not found: {file_path}")
-        return None
-
 def get_added_smells(original_smells, refactored_smells, file_path):
     """
     Identify which smell types were added in the refactored version for the given file.
@@ -126,95 +78,370 @@ def get_added_smells(original_smells, refactored_smells, file_path):
 
     return added_types
 
+def get_sample_folder(repository_path, tool, smell_id):
+    """Return the refactoring_data folder of a sample."""
+    return os.path.join(repository_path, "refactoring_data", tool, f"smell_{smell_id}")
+
+def get_dataset_paths(repository_path, tools_name):
+    """Return the input and output paths of the Refactor dataset of a tool."""
+    assets_folder = os.path.join(repository_path, "scripts", "assets")
+    refactor_dataset_path = os.path.join(assets_folder, f"Refactor - Dataset_{tools_name}.csv")
+    refactor_dataset_output_path = os.path.join(assets_folder, f"Refactor - Dataset_{tools_name}_updated.csv")
+    return refactor_dataset_path, refactor_dataset_output_path
+
+def read_summary(file_path):
+    """Parse a test summary file in one pass, or return None when it is missing."""
+    summary = parse_summary_file(file_path)
+    if summary is None:
+        print(f"Test summary file not found: {file_path}")
+    return summary
 
-def main():
+def update_test_results(refactor_dataset, index, sample_folder, summary_texts=None):
+    """
+    Fill the test and coverage columns of a row from the sample test summaries.
+    summary_texts maps each side to its summary file content (None when missing)
+    and is read from the sample folder when not given.
+    """
+    if summary_texts is None:
+        original_summary = read_summary(os.path.join(sample_folder, SUMMARY_FILES["original"]))
+        refactored_summary = read_summary(os.path.join(sample_folder, SUMMARY_FILES["refactored"]))
+    else:
+        original_text = summary_texts.get("original")
+        refactored_text = summary_texts.get("refactored")
+        original_summary = parse_summary_text(original_text) if original_text is not None else None
+        refactored_summary = parse_summary_text(refactored_text) if refactored_text is not None else None
+
+    # A missing summary counts as no passed test and no coverage
+    empty_summary = JestSummary()
+    original_summary = original_summary or empty_summary
+    refactored_summary = refactored_summary or empty_summary
+
+    # Update the dataset
+    refactor_dataset.at[index, "Test before"] = original_summary.test_section
+    refactor_dataset.at[index, "Test after"] = refactored_summary.test_section
+    refactor_dataset.at[index, "Coverage before"] = original_summary.coverage_section
+    refactor_dataset.at[index, "Coverage after"] = refactored_summary.coverage_section
+    refactor_dataset.at[index, "Test results changed"] = original_summary.passed != refactored_summary.passed
+    refactor_dataset.at[index, "Coverage changed"] = original_summary.coverage != refactored_summary.coverage
+
+def process_dataset_row_by_row(refactor_dataset, tool, repository_path):
+    """
+    Update the dataset one row at a time, re-reading the smells of each sample.
+    Kept as the reference implementation for the benchmark.
+    """
+    for index, row in refactor_dataset.iterrows():
+        # Extract relevant fields
+        file_path = row["File"][1:]  # Remove the first character from file_path
+        smell_type = row["Type"]
+        smell_id = row["Id"]
+
+        sample_folder = get_sample_folder(repository_path, tool, smell_id)
+        original_smells_path = os.path.join(sample_folder, "original_smells.csv")
+        refactored_smells_path = os.path.join(sample_folder, "refactored_smells.csv")
+
+        try:
+            # Load smells data
+            original_smells = pd.read_csv(original_smells_path)
+            refactored_smells = pd.read_csv(refactored_smells_path)
+
+            # Filter smells for the specific file and type
+            original_filtered = filter_smells(original_smells, file_path, smell_type)
+            refactored_filtered = filter_smells(refactored_smells, file_path, smell_type)
+
+            # Count occurrences of the smell in both datasets
+            original_count = len(original_filtered)
+            refactored_count = len(refactored_filtered)
+
+            # Check if a smell was removed or added
+            refactor_dataset.at[index, "Removed smell"] = is_smell_removed(original_count, refactored_count)
+            refactor_dataset.at[index, "Added new smell"] = is_smell_added(original_count, refactored_count)
+
+            # Identify which smell(s) were added, if any
+            added_smells = []
+            if is_smell_added(original_count, refactored_count):
+                added_smells = get_added_smells(original_smells, refactored_smells, file_path)
+            refactor_dataset.at[index, "Smell added"] = str(added_smells) if added_smells else ""
+
+            update_test_results(refactor_dataset, index, sample_folder)
+
+        except FileNotFoundError:
+            # If the smell files are missing, mark as False
+            print(f"Smell files not found for Id={smell_id}. Skipping...")
+            refactor_dataset.at[index, "Removed smell"] = False
+            refactor_dataset.at[index, "Added new smell"] = False
+            refactor_dataset.at[index, "Smell added"] = ""
+
+    return refactor_dataset
+
+def load_smells_frame(repository_path, tools, samples=None):
+    """
+    Load the smells CSVs of every sample, or only of the (tool, smell_id) in
+    samples, into a single long-format frame with the columns tool, smell_id,
+    side, file and type.
+    Returns the frame and the set of (tool, smell_id) having both sides.
+    """
+    frames = []
+    complete_samples = set()
+
+    for tool in tools:
+        tool_folder = os.path.join(repository_path, "refactoring_data", tool)
+        if not os.path.isdir(tool_folder):
+            print(f"Refactoring data not found for tool={tool}. Skipping...")
+            continue
+
+        if samples is None:
+            sample_names = os.listdir(tool_folder)
+        else:
+            sample_names = [f"smell_{smell_id}" for sample_tool, smell_id in samples if sample_tool == tool]
+
+        for sample_name in sample_names:
+            if not sample_name.startswith("smell_"):
+                continue
+            smell_id = int(sample_name[len("smell_"):])
+
+            side_frames = []
+            for side in SMELL_SIDES:
+                smells_path = os.path.join(tool_folder, sample_name, f"{side}_smells.csv")
+                if not os.path.exists(smells_path):
+                    break
+                smells = pd.read_csv(smells_path, usecols=["file", "type"])
+                smells["side"] = side
+                side_frames.append(smells)
+            else:
+                for smells in side_frames:
+                    smells["tool"] = tool
+                    smells["smell_id"] = smell_id
+                    frames.append(smells)
+                complete_samples.add((tool, smell_id))
+
+    columns = ["tool", "smell_id", "side", "file", "type"]
+    if not frames:
+        return pd.DataFrame(columns=columns), complete_samples
+    return pd.concat(frames, ignore_index=True)[columns], complete_samples
+
+def compute_smell_changes(refactor_dataset, smells_frame, complete_samples, tool):
+    """
+    Compute the "Removed smell", "Added new smell" and "Smell added" columns
+    for every row of the dataset with a single merge and groupby.
+    Returns a frame aligned with the dataset index plus a "Has smells" column.
+    """
+    rows = pd.DataFrame({
+        "row": refactor_dataset.index,
+        "smell_id": refactor_dataset["Id"].to_numpy(),
+        "file_path": refactor_dataset["File"].str[1:].to_numpy(),  # Remove the first character from file_path
+        "smell_type": refactor_dataset["Type"].to_numpy(),
+    })
+    has_smells = [(tool, smell_id) in complete_samples for smell_id in rows["smell_id"]]
+
+    # Pair every row with all smells of its sample and keep those of the row's file
+    smell_columns = [column for column in ["smell_id", "side", "file", "type", "count"] if column in smells_frame.columns]
+    tool_smells = smells_frame.loc[smells_frame["tool"] == tool, smell_columns]
+    matches = rows.merge(tool_smells, on="smell_id")
+    in_file = [
+        isinstance(file, str) and isinstance(file_path, str) and file_path in file
+        for file, file_path in zip(matches["file"], matches["file_path"])
+    ]
+    matches = matches[in_file]
+
+    # Smell counts per (row, type) with one column per side. A frame from
+    # ResultsStore.load_smell_counts already has a count per smell row
+    grouped = matches.groupby(["row", "type", "side"])
+    counts = (
+        (grouped["count"].sum() if "count" in matches.columns else grouped.size())
+        .unstack("side", fill_value=0)
+        .reindex(columns=SMELL_SIDES, fill_value=0)
+    )
+
+    # Counts of the smell type each row was refactored for
+    target_counts = counts.reindex(
+        pd.MultiIndex.from_arrays([rows["row"], rows["smell_type"]]), fill_value=0
+    )
+    original_count = target_counts["original"].to_numpy()
+    refactored_count = target_counts["refactored"].to_numpy()
+    removed = is_smell_removed(original_count, refactored_count) & has_smells
+    added = is_smell_added(original_count, refactored_count) & has_smells
+
+    # Smell types whose count grew, which includes types absent from the original file
+    increased = counts[counts["refactored"] > counts["original"]].reset_index()
+    added_types = increased.groupby("row")["type"].agg(list)
+    added_types = added_types.reindex(rows["row"]).to_numpy()
+
+    return pd.DataFrame({
+        "Removed smell": removed,
+        "Added new smell": added,
+        "Smell added": [
+            str(types) if is_added and isinstance(types, list) else ""
+            for is_added, types in zip(added, added_types)
+        ],
+        "Has smells": has_smells,
+    }, index=refactor_dataset.index)
+
+def process_dataset(refactor_dataset, smells_frame, complete_samples, tool, repository_path, test_summaries=None):
+    """
+    Update the dataset using the batch smell comparison. test_summaries maps
+    (smell_id, side) to the summary file contents, as returned by
+    ResultsStore.get_test_summaries; the files are read when it is None.
+    """
+    changes = compute_smell_changes(refactor_dataset, smells_frame, complete_samples, tool)
+
+    for column in ["Removed smell", "Added new smell", "Smell added"]:
+        refactor_dataset[column] = changes[column]
+
+    for index, row in refactor_dataset[changes["Has smells"]].iterrows():
+        summary_texts = None
+        if test_summaries is not None:
+            summary_texts = dict((side, test_summaries.get((row["Id"], side))) for side in SMELL_SIDES)
+        update_test_results(refactor_dataset, index, get_sample_folder(repository_path, tool, row["Id"]), summary_texts)
+
+    for smell_id in refactor_dataset.loc[~changes["Has smells"], "Id"]:
+        print(f"Smell files not found for Id={smell_id}. Skipping...")
+
+    return refactor_dataset
 
+def get_sample_inputs(repository_path, tool, smell_id):
+    """Return the files a row of a sample is computed from."""
+    sample_folder = get_sample_folder(repository_path, tool, smell_id)
+    return [os.path.join(sample_folder, f"{side}_smells.csv") for side in SMELL_SIDES] + \
+        [os.path.join(sample_folder, SUMMARY_FILES[side]) for side in SMELL_SIDES]
+
+def to_json_value(value):
+    # numpy scalars to the Python bool, int or float they hold
+    return value.item() if hasattr(value, "item") else value
+
+def process_dataset_incremental(refactor_dataset, tool, repository_path, manifest, full=False):
+    """
+    Update the dataset like process_dataset, but only recompute the rows whose
+    fingerprint in the manifest changed: the row itself or the smell CSVs and
+    test summaries of its sample. The other rows take their derived columns from
+    the manifest. Returns the dataset and the number of rows recomputed.
+    """
+    stored_rows = {} if full else manifest.get_rows(tool)
+    fingerprints = {}
+    dirty_indexes = []
+    for index, row_values in zip(refactor_dataset.index, refactor_dataset.itertuples(index=False)):
+        smell_id = int(refactor_dataset.at[index, "Id"])
+        input_hashes = [manifest.hash_input(tool, path) for path in get_sample_inputs(repository_path, tool, smell_id)]
+        fingerprints[smell_id] = manifest.make_fingerprint(list(row_values), input_hashes)
+        if stored_rows.get(smell_id, (None,))[0] != fingerprints[smell_id]:
+            dirty_indexes.append(index)
+
+    rows = dict((smell_id, stored) for smell_id, stored in stored_rows.items() if smell_id in fingerprints)
+    if dirty_indexes:
+        dirty_dataset = refactor_dataset.loc[dirty_indexes].copy()
+        samples = set((tool, int(smell_id)) for smell_id in dirty_dataset["Id"])
+        smells_frame, complete_samples = load_smells_frame(repository_path, [tool], samples)
+        dirty_dataset = process_dataset(dirty_dataset, smells_frame, complete_samples, tool, repository_path)
+
+        for index in dirty_indexes:
+            smell_id = int(dirty_dataset.at[index, "Id"])
+            columns = SMELL_CHANGE_COLUMNS
+            if (tool, smell_id) in complete_samples:
+                columns = SMELL_CHANGE_COLUMNS + TEST_RESULT_COLUMNS
+            rows[smell_id] = (fingerprints[smell_id],
+                              dict((column, to_json_value(dirty_dataset.at[index, column])) for column in columns))
+
+    for column in SMELL_CHANGE_COLUMNS:
+        if column not in refactor_dataset.columns:
+            refactor_dataset[column] = ""
+    for index in refactor_dataset.index:
+        _, columns = rows[int(refactor_dataset.at[index, "Id"])]
+        for column, value in columns.items():
+            refactor_dataset.at[index, column] = value
+
+    manifest.put_rows(tool, rows)
+    return refactor_dataset, len(dirty_indexes)
+
+def normalize_smells_added(value):
+    """Return the smell types of a "Smell added" cell in a comparable form."""
+    if not isinstance(value, str) or not value:
+        return []
+    return sorted(re.findall(r"'([^']*)'", value))
+
+def benchmark(repository_path):
+    """Time the row-by-row and batch implementations and check they agree."""
+    tools = list(TOOLS)
+
+    start = time.perf_counter()
+    row_by_row_results = {}
+    for tool, tools_name in TOOLS.items():
+        refactor_dataset_path, _ = get_dataset_paths(repository_path, tools_name)
+        refactor_dataset = pd.read_csv(refactor_dataset_path)
+        row_by_row_results[tool] = process_dataset_row_by_row(refactor_dataset, tool, repository_path)
+    row_by_row_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch_results = {}
+    smells_frame, complete_samples = load_smells_frame(repository_path, tools)
+    for tool, tools_name in TOOLS.items():
+        refactor_dataset_path, _ = get_dataset_paths(repository_path, tools_name)
+        refactor_dataset = pd.read_csv(refactor_dataset_path)
+        batch_results[tool] = process_dataset(refactor_dataset, smells_frame, complete_samples, tool, repository_path)
+    batch_time = time.perf_counter() - start
 
-    tools = ["copilot", "whisper"]
-    tools_name = ''
-    
     for tool in tools:
+        expected = row_by_row_results[tool].copy()
+        actual = batch_results[tool].copy()
+        for frame in (expected, actual):
+            frame["Smell added"] = frame["Smell added"].map(normalize_smells_added)
+        pd.testing.assert_frame_equal(expected, actual, check_dtype=False)
 
-        if tool == "copilot":
-            tools_name = "Copilot"
-        elif tool == "whisper":
-            tools_name = "Whisperer"
+    print(f"Row by row: {row_by_row_time:.3f}s")
+    print(f"Batch:      {batch_time:.3f}s")
+    print(f"Speedup:    {row_by_row_time / batch_time:.1f}x")
 
-        # File paths
-        refactor_dataset_path = f"/home/username/Desktop/refactoring-smells/scripts/assets/Refactor - Dataset_{tools_name}.csv"
-        refactor_dataset_output_path = f"/home/username/Desktop/refactoring-smells/scripts/assets/Refactor - Dataset_{tools_name}_updated.csv"
+def main():
+    parser = argparse.ArgumentParser(description="Compare the smells and test results of the refactored samples.")
+    parser.add_argument('--benchmark', action='store_true',
+                        help="time the row-by-row and batch comparisons and check they agree")
+    parser.add_argument('--store', nargs='?', const=os.getenv('RESULTS_STORE_PATH') or DEFAULT_STORE_PATH,
+                        help="read the smells and test summaries from a results store built with "
+                             "'python results_store.py ingest' (default: RESULTS_STORE_PATH or "
+                             "scripts/.results_store.sqlite) instead of refactoring_data/")
+    parser.add_argument('--manifest', default=os.getenv('CHECK_SMELLS_MANIFEST_PATH') or DEFAULT_MANIFEST_PATH,
+                        help="manifest of the rows computed by previous runs (default: CHECK_SMELLS_MANIFEST_PATH "
+                             "or scripts/.check_smells_manifest.sqlite)")
+    parser.add_argument('--full', action='store_true',
+                        help="recompute every row instead of only those whose inputs changed")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(REPOSITORY_PATH)
+        return
+
+    if not args.store:
+        manifest = AnalysisManifest(args.manifest)
+        for tool, tools_name in TOOLS.items():
+            refactor_dataset_path, refactor_dataset_output_path = get_dataset_paths(REPOSITORY_PATH, tools_name)
+            if not args.full and manifest.is_up_to_date(tool, refactor_dataset_path, refactor_dataset_output_path):
+                print(f"Updated dataset is up to date: {refactor_dataset_output_path}")
+                continue
+
+            # Recompute the changed rows and merge them with the others
+            refactor_dataset = pd.read_csv(refactor_dataset_path)
+            refactor_dataset, recomputed = process_dataset_incremental(refactor_dataset, tool, REPOSITORY_PATH,
+                                                                       manifest, args.full)
+            refactor_dataset.to_csv(refactor_dataset_output_path, index=False)
+            manifest.put_output(tool, refactor_dataset_path, refactor_dataset_output_path)
+            print(f"Updated dataset saved to {refactor_dataset_output_path} "
+                  f"({recomputed} of {len(refactor_dataset)} rows recomputed)")
+        manifest.close()
+        return
+
+    # The results store is a snapshot of its own, every row is computed from it
+    try:
+        store = ResultsStore(args.store)
+    except FileNotFoundError as error:
+        print(error)
+        sys.exit(1)
+    smells_frame, complete_samples = store.load_smell_counts(list(TOOLS))
+
+    for tool, tools_name in TOOLS.items():
+        refactor_dataset_path, refactor_dataset_output_path = get_dataset_paths(REPOSITORY_PATH, tools_name)
 
         # Load the dataset
         refactor_dataset = pd.read_csv(refactor_dataset_path)
-
-        # Iterate over each row in the dataset
-        for index, row in refactor_dataset.iterrows():
-            # Extract relevant fields
-            file_path = row["File"][1:]  # Remove the first character from file_path
-            smell_type = row["Type"]
-            smell_id = row["Id"]
-
-            # File paths for smells
-            original_smells_path = f"/home/username/Desktop/refactoring-smells/refactoring_data/{tool}/smell_{smell_id}/original_smells.csv"
-            refactored_smells_path = f"/home/username/Desktop/refactoring-smells/refactoring_data/{tool}/smell_{smell_id}/refactored_smells.csv"
-
-            # File paths for test summaries
-            original_test_summary_path = f"/home/username/Desktop/refactoring-smells/refactoring_data/{tool}/smell_{smell_id}/original_tests_summary.txt"
-            refactored_test_summary_path = f"/home/username/Desktop/refactoring-smells/refactoring_data/{tool}/smell_{smell_id}/refactored_test_summary.txt"
-
-            try:
-                # Load smells data
-                original_smells = pd.read_csv(original_smells_path)
-                refactored_smells = pd.read_csv(refactored_smells_path)
-
-                # Filter smells for the specific file and type
-                original_filtered = filter_smells(original_smells, file_path, smell_type)
-                refactored_filtered = filter_smells(refactored_smells, file_path, smell_type)
-
-                # Count occurrences of the smell in both datasets
-                original_count = len(original_filtered)
-                refactored_count = len(refactored_filtered)
-
-                # Check if a smell was removed or added
-                refactor_dataset.at[index, "Removed smell"] = is_smell_removed(original_count, refactored_count)
-                refactor_dataset.at[index, "Added new smell"] = is_smell_added(original_count, refactored_count)
-
-                # Identify which smell(s) were added, if any
-                added_smells = []
-                if is_smell_added(original_count, refactored_count):
-                    added_smells = get_added_smells(original_smells, refactored_smells, file_path)
-                refactor_dataset.at[index, "Smell added"] = str(added_smells) if added_smells else ""
-
-                # Read test summaries
-                original_test_summary = read_test_summary(original_test_summary_path)
-                refactored_test_summary = read_test_summary(refactored_test_summary_path)
-
-                # Read coverage summaries
-                original_coverage_summary = read_coverage_summary(original_test_summary_path)
-                refactored_coverage_summary = read_coverage_summary(refactored_test_summary_path)
-
-                # Check if test results have changed
-                results_changed = test_results_changed(original_test_summary, refactored_test_summary)
-
-                # Check if coverage results have changed
-                coverage_changed = coverage_results_changed(original_coverage_summary, refactored_coverage_summary)
-
-
-                # Update the dataset
-                refactor_dataset.at[index, "Test before"] = original_test_summary if original_test_summary else ""
-                refactor_dataset.at[index, "Test after"] = refactored_test_summary if refactored_test_summary else ""
-                refactor_dataset.at[index, "Coverage before"] = original_coverage_summary if original_coverage_summary else ""
-                refactor_dataset.at[index, "Coverage after"] = refactored_coverage_summary if refactored_coverage_summary else ""
-                refactor_dataset.at[index, "Test results changed"] = results_changed
-                refactor_dataset.at[index, "Coverage changed"] = coverage_changed
-
-
-            except FileNotFoundError:
-                # If the smell files are missing, mark as False
-                print(f"Smell files not found for Id={smell_id}. Skipping...")
-                refactor_dataset.at[index, "Removed smell"] = False
-                refactor_dataset.at[index, "Added new smell"] = False
-                refactor_dataset.at[index, "Smell added"] = ""
+        refactor_dataset = process_dataset(refactor_dataset, smells_frame, complete_samples, tool, REPOSITORY_PATH,
+                                           store.get_test_summaries(tool))
 
         # Save the updated dataset to a new file
         refactor_dataset.to_csv(refactor_dataset_output_path, index=False)
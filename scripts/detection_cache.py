@@ -0,0 +1,136 @@
+# ----------------------------------------------------------------------------------------
+# On-disk cache of test smell detections. Each entry holds the smells a detector
+# reported for one test file and is keyed by the detector name and version, the
+# hash of the file content and the selected smell types, so a file is only
+# detected again when its content, the tool or the selection changes.
+# Entries are evicted least recently used first once the cache exceeds its size.
+# ----------------------------------------------------------------------------------------
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+# Default maximum size of the stored detections
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# Smell types value used when a detector keeps every type it reports
+ALL_SMELL_TYPES = ['*']
+
+def hash_file(file_path):
+    """Return the SHA-256 hash of a file content."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def get_tool_version(tool_path):
+    """Return the version in the package.json of a detection tool, or 'unknown'."""
+    try:
+        with open(os.path.join(tool_path, 'package.json'), 'r') as package_file:
+            return json.load(package_file).get('version', 'unknown')
+    except (OSError, ValueError):
+        return 'unknown'
+
+class DetectionCache:
+    """SQLite backed cache of the smells detected in a test file."""
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES):
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = {}
+        self.misses = {}
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS detections ('
+            'key TEXT PRIMARY KEY, '
+            'detector TEXT NOT NULL, '
+            'version TEXT NOT NULL, '
+            'content_hash TEXT NOT NULL, '
+            'smell_types TEXT NOT NULL, '
+            'rows TEXT NOT NULL, '
+            'size INTEGER NOT NULL, '
+            'last_used REAL NOT NULL)'
+        )
+        self.connection.execute(
+            'CREATE INDEX IF NOT EXISTS detections_last_used ON detections (last_used)'
+        )
+        self.connection.commit()
+
+    @staticmethod
+    def make_key(detector, version, content_hash, smell_types):
+        """Return the key of a detection."""
+        return '|'.join([detector, version, content_hash, ','.join(sorted(smell_types))])
+
+    def get(self, detector, version, content_hash, smell_types):
+        """Return the cached rows of a detection, or None when it is not cached."""
+        key = self.make_key(detector, version, content_hash, smell_types)
+        with self.lock:
+            entry = self.connection.execute(
+                'SELECT rows FROM detections WHERE key = ?', (key,)
+            ).fetchone()
+            if entry is None:
+                self.misses[detector] = self.misses.get(detector, 0) + 1
+                return None
+
+            self.hits[detector] = self.hits.get(detector, 0) + 1
+            self.connection.execute(
+                'UPDATE detections SET last_used = ? WHERE key = ?', (time.time(), key)
+            )
+            self.connection.commit()
+        return json.loads(entry[0])
+
+    def put(self, detector, version, content_hash, smell_types, rows):
+        """Store the rows of a detection and evict old entries if the cache is full."""
+        key = self.make_key(detector, version, content_hash, smell_types)
+        serialized_rows = json.dumps(rows, default=str)
+        with self.lock:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO detections '
+                '(key, detector, version, content_hash, smell_types, rows, size, last_used) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, detector, version, content_hash, ','.join(sorted(smell_types)),
+                 serialized_rows, len(serialized_rows), time.time())
+            )
+            self.evict()
+            self.connection.commit()
+
+    def evict(self):
+        """Delete the least recently used entries until the cache fits in max_bytes."""
+        total_size = self.connection.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM detections'
+        ).fetchone()[0]
+        if total_size <= self.max_bytes:
+            return
+
+        entries = self.connection.execute(
+            'SELECT key, size FROM detections ORDER BY last_used'
+        ).fetchall()
+        for key, size in entries:
+            if total_size <= self.max_bytes:
+                break
+            self.connection.execute('DELETE FROM detections WHERE key = ?', (key,))
+            total_size -= size
+
+    def report(self):
+        """Return a line with the hits and misses of each detector."""
+        detectors = sorted(set(self.hits) | set(self.misses))
+        if not detectors:
+            return "Detection cache: not used"
+        counters = ', '.join(
+            f"{detector} {self.hits.get(detector, 0)} hits/{self.misses.get(detector, 0)} misses"
+            for detector in detectors
+        )
+        return f"Detection cache: {counters}"
+
+    def close(self):
+        """Close the connection to the cache."""
+        with self.lock:
+            self.connection.close()
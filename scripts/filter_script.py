@@ -1,74 +1,126 @@
-import requests
+import base64
+import json
 import csv
 import os
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from github_client import GitHubClient
+from http_cache import ResponseCache, DEFAULT_MAX_AGE
 
 # Load environment variables from .env file
 load_dotenv()
 
-# GitHub API base URL
-GITHUB_API_URL = "https://api.github.com"
-
 # Retrieve the GitHub personal access token from the .env file
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 
-# Headers for authentication
-HEADERS = {
-    "Authorization": f"token {GITHUB_TOKEN}"
-}
+# Test frameworks looked up in the devDependencies, in order of preference
+TEST_FRAMEWORKS = ["jest", "mocha", "jasmine", "ava", "cypress"]
 
-def get_repository_languages(owner, repo_name):
+def get_repository_languages(client, owner, repo_name):
     """
     Fetch the languages used in a repository.
     """
-    url = f"{GITHUB_API_URL}/repos/{owner}/{repo_name}/languages"
-    response = requests.get(url, headers=HEADERS)
-    response.raise_for_status()
-    return response.json()
+    languages = client.get_json(f"/repos/{owner}/{repo_name}/languages")
+    if languages is None:
+        raise ValueError(f"Repository not found: {owner}/{repo_name}")
+    return languages
 
-def get_package_json(owner, repo_name):
+def get_package_json(client, owner, repo_name):
     """
     Fetch the package.json file from a repository.
     """
-    url = f"{GITHUB_API_URL}/repos/{owner}/{repo_name}/contents/package.json"
-    response = requests.get(url, headers=HEADERS)
-    if response.status_code == 200:
-        package_json = response.json()
-        return requests.get(package_json['download_url']).json()
-    return None
+    package_json = client.get_json(f"/repos/{owner}/{repo_name}/contents/package.json")
+    if package_json is None:
+        return None
+    # Files under 1 MB come inlined in the contents response
+    if package_json.get('encoding') == 'base64' and package_json.get('content'):
+        return json.loads(base64.b64decode(package_json['content']))
+    return client.get_json(package_json['download_url'])
 
-def get_license_info(owner, repo_name):
+def get_license_info(client, owner, repo_name):
     """
     Fetch the license information for a repository.
     """
-    url = f"{GITHUB_API_URL}/repos/{owner}/{repo_name}"
-    response = requests.get(url, headers=HEADERS)
-    response.raise_for_status()
-    repo_data = response.json()
-    license_info = repo_data.get("license", {})
+    repo_data = client.get_json(f"/repos/{owner}/{repo_name}")
+    if repo_data is None:
+        raise ValueError(f"Repository not found: {owner}/{repo_name}")
+    license_info = repo_data.get("license") or {}
     return license_info.get("name", "No license")
 
-def analyze_repository(owner, repo_name):
+class PackageJsonCache:
     """
-    Analyze a repository and extract the required information.
+    Directory of the package.json files already fetched, one owner__repo.json
+    file per repository. Repositories without a package.json are stored as null.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+
+    def get_path(self, owner, repo_name):
+        return os.path.join(self.folder, f"{owner}__{repo_name}.json")
+
+    def get(self, client, owner, repo_name):
+        """Return the cached package.json of a repository, fetching it on a miss."""
+        path = self.get_path(owner, repo_name)
+        try:
+            with open(path, "r", encoding="utf-8") as package_file:
+                return json.load(package_file)
+        except FileNotFoundError:
+            pass
+
+        package_json = get_package_json(client, owner, repo_name)
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as package_file:
+            json.dump(package_json, package_file)
+        os.replace(temporary_path, path)
+        return package_json
+
+def get_javascript_percentage(languages):
+    """
+    Compute the share of JavaScript bytes among the languages of a repository.
     """
-    # Get languages and calculate JavaScript percentage
-    languages = get_repository_languages(owner, repo_name)
     total_bytes = sum(languages.values())
-    js_percentage = (languages.get("JavaScript", 0) / total_bytes * 100) if total_bytes > 0 else 0
+    return (languages.get("JavaScript", 0) / total_bytes * 100) if total_bytes > 0 else 0
 
-    # Get package.json and test framework
-    package_json = get_package_json(owner, repo_name)
-    test_framework = "no framework test"
+def get_test_framework(package_json):
+    """
+    Return the first known test framework of the devDependencies of a package.json.
+    """
     if package_json and "devDependencies" in package_json:
         dev_dependencies = package_json["devDependencies"]
-        for framework in ["jest", "mocha", "jasmine", "ava", "cypress"]:
+        for framework in TEST_FRAMEWORKS:
             if framework in dev_dependencies:
-                test_framework = framework
-                break
+                return framework
+    return "no framework test"
+
+def analyze_repository(client, owner, repo_name, metadata=None, package_cache=None):
+    """
+    Analyze a repository and extract the required information. When metadata
+    holds the languages and license columns of repositories.csv, only the
+    package.json is looked up, in package_cache first when one is given.
+    """
+    # Get languages and calculate JavaScript percentage
+    if metadata is not None:
+        languages = json.loads(metadata["languages"] or "{}")
+    else:
+        languages = get_repository_languages(client, owner, repo_name)
+    js_percentage = get_javascript_percentage(languages)
+
+    # Get package.json and test framework
+    if package_cache is not None:
+        package_json = package_cache.get(client, owner, repo_name)
+    else:
+        package_json = get_package_json(client, owner, repo_name)
+    test_framework = get_test_framework(package_json)
 
     # Get license information
-    license_name = get_license_info(owner, repo_name)
+    if metadata is not None:
+        license_name = metadata["license"] or "No license"
+    else:
+        license_name = get_license_info(client, owner, repo_name)
 
     return {
         "javascript_percentage": js_percentage,
@@ -76,32 +128,86 @@ def analyze_repository(owner, repo_name):
         "license": license_name
     }
 
+def classify_repository(client, row, use_metadata=False, package_cache=None):
+    """
+    Classify a repository, returning its output row or None when it failed.
+    """
+    repo_full_name = row["name"]
+    owner, repo_name = repo_full_name.split("/", 1)
+    try:
+        repo_data = analyze_repository(
+            client, owner, repo_name, row if use_metadata else None, package_cache
+        )
+    except Exception as e:
+        print(f"Failed to process repository {repo_full_name}: {e}")
+        return None
+
+    print(f"Processed repository: {repo_full_name}")
+    return [
+        repo_full_name,
+        f"{repo_data['javascript_percentage']:.2f}%",
+        repo_data["test_framework"],
+        repo_data["license"]
+    ]
+
+def parse_arguments():
+    """Parse the command line arguments of the classifier."""
+    parser = argparse.ArgumentParser(description="Classify GitHub repositories by JavaScript usage, test framework and license.")
+    parser.add_argument('--input', default="repo_list_initial.csv",
+                        help="CSV with a name column of owner/repo, e.g. datasets/repositories.csv")
+    parser.add_argument('--output', default="output_classification.csv")
+    parser.add_argument('--workers', type=int, default=8, help="repositories classified at once")
+    parser.add_argument('--retries', type=int, default=3, help="retries of connection and server errors")
+    parser.add_argument('--api-url', help="GitHub API base URL (default: GITHUB_API_URL or https://api.github.com)")
+    parser.add_argument('--from-metadata', action='store_true',
+                        help="take the languages and license from the columns of the input "
+                             "(datasets/repositories.csv) and only look up the package.json")
+    parser.add_argument('--package-cache', default=os.getenv("PACKAGE_JSON_CACHE", ""),
+                        help="folder keeping the fetched package.json files between runs")
+    parser.add_argument('--http-cache', default=os.getenv("GITHUB_CACHE_PATH", ""),
+                        help="response cache file (default: GITHUB_CACHE_PATH or scripts/.github_cache.sqlite)")
+    parser.add_argument('--max-age', type=float, default=DEFAULT_MAX_AGE / 3600,
+                        help="hours a cached response is used before it is revalidated")
+    parser.add_argument('--offline', action='store_true', help="only use cached responses")
+    parser.add_argument('--no-http-cache', action='store_true', help="request every response again")
+    return parser.parse_args()
+
 def main():
-    # Read repositories from repo_list_initial.csv
-    input_csv_path = "repo_list_initial.csv"
-    output_csv_path = "output_classification.csv"
+    args = parse_arguments()
+    workers = max(1, args.workers)
+    cache = None
+    if not args.no_http_cache:
+        cache_path = args.http_cache or os.path.join(os.path.dirname(os.path.abspath(__file__)), ".github_cache.sqlite")
+        cache = ResponseCache(cache_path, args.max_age * 3600, args.offline)
+    client = GitHubClient(GITHUB_TOKEN, args.api_url, pool_size=workers, retries=max(0, args.retries), cache=cache)
+    package_cache = PackageJsonCache(args.package_cache) if args.package_cache else None
+
+    with open(args.input, mode="r", encoding="utf-8") as input_file, \
+         open(args.output, mode="w", newline="", encoding="utf-8") as output_file:
 
-    with open(input_csv_path, mode="r", encoding="utf-8") as input_file, \
-         open(output_csv_path, mode="w", newline="", encoding="utf-8") as output_file:
-        
         reader = csv.DictReader(input_file)
+        if args.from_metadata and not {"languages", "license"} <= set(reader.fieldnames or []):
+            raise ValueError(f"{args.input} has no languages and license columns for --from-metadata")
         writer = csv.writer(output_file)
         writer.writerow(["Name", "JavaScript Percentage", "Test Framework", "License"])
 
-        for row in reader:
-            repo_full_name = row["name"]
-            owner, repo_name = repo_full_name.split("/", 1)
-            try:
-                repo_data = analyze_repository(owner, repo_name)
-                writer.writerow([
-                    repo_full_name,
-                    f"{repo_data['javascript_percentage']:.2f}%",
-                    repo_data["test_framework"],
-                    repo_data["license"]
-                ])
-                print(f"Processed repository: {repo_full_name}")
-            except Exception as e:
-                print(f"Failed to process repository {repo_full_name}: {e}")
+        start = time.monotonic()
+        processed = failed = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Rows are written in the order of the input as they complete
+            classify = lambda row: classify_repository(client, row, args.from_metadata, package_cache)
+            for output_row in executor.map(classify, reader):
+                if output_row is None:
+                    failed += 1
+                    continue
+                writer.writerow(output_row)
+                processed += 1
+
+    client.close()
+    print(f"Classified {processed} repositories ({failed} failed) in {time.monotonic() - start:.1f}s")
+    if cache is not None:
+        print(cache.report())
+        cache.close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -7,17 +7,43 @@
 # ----------------------------------------------------------------------------------------
 
 import os
-import subprocess
+import re
+import sys
 import json
+import time
+import argparse
+import tempfile
+import subprocess
 import shutil
 import csv
 import asyncio
 import pandas as pd
 from dotenv import load_dotenv
+from steel_report import iter_steel_smells
+from detection_cache import DetectionCache, DEFAULT_MAX_BYTES, ALL_SMELL_TYPES, hash_file, get_tool_version
+from snuts_client import SnutsClient
+from jest_summary import SUMMARY_FILES, format_summary_text
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Projects analyzed in the research
+PROJECTS_NAMES = {
+    1: 'vanilla-lazyload',
+    2: 'binance-trading-bot',
+    3: 'prettier',
+    4: 'react-beautiful-dnd',
+    5: 'intl-tel-input',
+    6: 'miragejs',
+    7: 'surfingkeys',
+    8: 'tether',
+    9: 'katex',
+    10: 'serverless-express',
+}
+
+# Detection tools, in the order their smells are combined
+DETECTORS = ['steel', 'snutsjs']
+
 # Logging utilities
 def log_info(message):
     """Log informational messages."""
@@ -35,52 +61,82 @@ def validate_env_variable(var_name):
         raise ValueError(f"Environment variable '{var_name}' is not set.")
     return value
 
+# Sample folder utilities
+def get_sample_folder(smell_number, llm):
+    """Return the refactoring_data folder of a sample."""
+    path_to_repository = validate_env_variable('PATH_TO_REPOSITORY')
+    return path_to_repository + f'/refactoring_data/{llm}/smell_{smell_number}'
+
 # Steel tool utilities
+def get_steel_test_files_pattern(project_name):
+    """Return the glob pattern Steel uses to find the test files of a project."""
+    if project_name == 'prettier':
+        return "{*.test.js,*.tests.js,*.spec.js,*.specs.js,test_*.js,test-*.js,Spec*.js}"
+    return "{**/__tests__/**/*.js,**/test/**/*.js,**/?(*.)+(test|tests|spec|specs).js,**/test_*.js,**/test-*.js,**/Spec*.js,**/*Test.js,**/*Tests.js}"
+
 def run_steel_tool(project_name, llm):
     """Run the steel detection tool."""
     smell_detections_tools_path = validate_env_variable('STEEL_DETECTION_TOOL_PATH')
     os.chdir(smell_detections_tools_path)
     log_info(f"Changed directory to {os.getcwd()}")
 
-    test_files_pattern = "{**/__tests__/**/*.js,**/test/**/*.js,**/?(*.)+(test|tests|spec|specs).js,**/test_*.js,**/test-*.js,**/Spec*.js,**/*Test.js,**/*Tests.js}"
-    
-    if project_name == 'prettier':
-        test_files_pattern = "{*.test.js,*.tests.js,*.spec.js,*.specs.js,test_*.js,test-*.js,Spec*.js}"
-    
+    test_files_pattern = get_steel_test_files_pattern(project_name)
     steel_command = f'npx steel detect "../../projects/{project_name}/**/{test_files_pattern}"'
 
     log_info(f"Running command: {steel_command}")
     subprocess.run(steel_command, shell=True, check=True)
 
-def process_steel_json_to_csv(smell_number, llm):
-    """Process the steel JSON file and convert it to a CSV."""
-    input_file = validate_env_variable('INPUT_STEEL_JSON')
-    path_to_repository = validate_env_variable('PATH_TO_REPOSITORY')
-    output_file =  path_to_repository + f'/refactoring_data/{llm}/smell_{smell_number}/steel.csv'
+def get_steel_project_target(project_name):
+    """Return the Steel glob matching every test file of a project."""
+    return f'../../projects/{project_name}/**/{get_steel_test_files_pattern(project_name)}'
+
+def get_steel_file_target(project_name, test_file):
+    """Return the Steel glob matching a single test file of a project."""
+    return f'../../projects/{project_name}{test_file}'
 
-    with open(input_file, 'r') as json_file:
-        data = json.load(json_file)
+def get_steel_report_name():
+    """Return the name of the Steel reports, taken from the folder the tool runs in."""
+    smell_detections_tools_path = validate_env_variable('STEEL_DETECTION_TOOL_PATH')
+    return os.path.basename(os.path.normpath(smell_detections_tools_path)).lower()
 
-    smelled_files = data.get('smelledFiles', [])
-    csv_data = []
+async def run_steel_tool_async(target, output_folder):
+    """
+    Run the steel detection tool on a glob without changing the working
+    directory, writing its reports to output_folder so several runs can overlap.
+    """
+    smell_detections_tools_path = validate_env_variable('STEEL_DETECTION_TOOL_PATH')
+    steel_command = ['npx', 'steel', '-o', output_folder, 'detect', target]
 
-    for smelled_file in smelled_files:
-        file_name = smelled_file.get('path', 'Unknown')
-        smelled_info = smelled_file.get('smellInfo', [])
+    log_info(f"Running command: {' '.join(steel_command)}")
+    process = await asyncio.create_subprocess_exec(
+        *steel_command,
+        cwd=smell_detections_tools_path,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    _, stderr = await process.communicate()
 
-        for smelled_info_item in smelled_info:
-            smell_type = smelled_info_item.get('name', 'Unknown')
-            items = smelled_info_item.get('items', [])
+    if process.returncode != 0:
+        log_error(f"Steel command failed with error:\n{stderr.decode()}")
+        raise subprocess.CalledProcessError(process.returncode, steel_command)
 
-            for item in items:
-                smell_lines = item.get('start', [])
-                frame = item.get('frame', 'Unknown')
-                csv_data.append([file_name, smell_type, smell_lines, frame])
+def iter_steel_json_rows(input_file):
+    """Stream the steel JSON file as rows of file, type, smells and frame."""
+    for file_name, smell_type, item in iter_steel_smells(input_file):
+        smell_lines = item.get('start', [])
+        frame = item.get('frame', 'Unknown')
+        yield [file_name, smell_type, smell_lines, frame]
+
+def process_steel_json_to_csv(smell_number, llm, input_file=None):
+    """Process the steel JSON file and convert it to a CSV."""
+    if input_file is None:
+        input_file = validate_env_variable('INPUT_STEEL_JSON')
+    output_file = get_sample_folder(smell_number, llm) + '/steel.csv'
 
     with open(output_file, 'w', newline='') as csv_file:
         writer = csv.writer(csv_file)
         writer.writerow(['file', 'type', 'smells', 'frame'])
-        writer.writerows(csv_data)
+        writer.writerows(iter_steel_json_rows(input_file))
 
     log_info(f"CSV file created successfully at: {output_file}")
 
@@ -88,29 +144,22 @@ def process_steel_json_to_csv(smell_number, llm):
 async def run_snuts_js(project_name, smell_number, llm):
     """Run the Snuts.js tool."""
     projects_folder = validate_env_variable('PROJECTS_FOLDER')
-    path_to_repository = validate_env_variable('PATH_TO_REPOSITORY')
-    snuts_output_folder = path_to_repository + f'/research/refactoring_data/{llm}/smell_{smell_number}/snutsjs.csv'
-
-    snuts_command = (
-        f'curl -X POST http://localhost:3001/export-csv-local '
-        f'-H "Content-Type: application/json" '
-        f'-d \'{{"directory":"{projects_folder}{project_name}/"}}\' '
-        f'-o {snuts_output_folder}'
-    )
-
-    log_info(f"Running command: {snuts_command}")
-    process = await asyncio.create_subprocess_shell(
-        snuts_command,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE
-    )
-    stdout, stderr = await process.communicate()
+    snuts_output_folder = get_sample_folder(smell_number, llm) + '/snutsjs.csv'
+    snuts_client = SnutsClient(concurrency=1)
+    try:
+        await run_snuts_js_directory(snuts_client, f'{projects_folder}{project_name}/', snuts_output_folder)
+    finally:
+        snuts_client.close()
 
-    if process.returncode == 0:
-        log_info(f"Snuts.js command completed successfully:\n{stdout.decode()}")
-    else:
-        log_error(f"Snuts.js command failed with error:\n{stderr.decode()}")
-        raise subprocess.CalledProcessError(process.returncode, snuts_command)
+async def run_snuts_js_directory(snuts_client, directory, output_file):
+    """Run the Snuts.js tool on a directory and save the CSV to output_file."""
+    log_info(f"Requesting Snuts.js analysis of {directory} from {snuts_client.base_url}")
+    try:
+        await snuts_client.export_csv_local_async(directory, output_file)
+    except Exception as e:
+        log_error(f"Snuts.js request failed with error:\n{e}")
+        raise
+    log_info(f"Snuts.js analysis of {directory} saved to {output_file}")
 
 # CSV utilities
 def concat_csv(name_run, smell_number, llm):
@@ -179,73 +228,433 @@ def copy_test_file(name_run, project_name, smell_number, llm):
     except Exception as e:
         log_error(f"An error occurred while copying the test file: {e}")
 
-# To Do
-def run_tests(name_run, project_name, smell_number, llm):
-    """Run the tests for the specified project."""
+# Test runner utilities
+# Extensions tried when resolving the relative imports of a test file
+TEST_SOURCE_EXTENSIONS = ['.js', '.jsx', '.mjs', '.cjs', '.ts', '.tsx']
+
+# Relative specifiers of require(), import() and import ... from
+IMPORT_PATTERN = re.compile(r"""(?:\brequire\s*\(\s*|\bimport\s*\(\s*|\bfrom\s+|\bimport\s+)(['"])(\.{1,2}/[^'"]+)\1""")
+
+def get_sample_test_file(smell_number):
+    """Return the path of the sample test file in its project, as listed in dataset.csv."""
     path_to_repository = validate_env_variable('PATH_TO_REPOSITORY')
-    test_command = f'npm run test:research'
+    df = pd.read_csv(path_to_repository + '/scripts/assets/dataset.csv', usecols=['Id', 'File'])
+    filtered_df = df.loc[df['Id'] == int(smell_number), 'File']
+    if filtered_df.empty:
+        raise ValueError(f"No entry found for smell_number: {smell_number}")
+    return filtered_df.values[0]
+
+def resolve_import(project_folder, importer_folder, specifier):
+    """Return the project file a relative import points to, or None."""
+    base_path = os.path.normpath(os.path.join(importer_folder, specifier))
+    candidates = [base_path] + [base_path + extension for extension in TEST_SOURCE_EXTENSIONS] + \
+        [os.path.join(base_path, 'index' + extension) for extension in TEST_SOURCE_EXTENSIONS]
+    for candidate in candidates:
+        if os.path.isfile(candidate) and os.path.splitext(candidate)[1] in TEST_SOURCE_EXTENSIONS:
+            relative_path = os.path.relpath(candidate, project_folder)
+            if not relative_path.startswith('..') and 'node_modules' not in relative_path.split(os.sep):
+                return relative_path
+    return None
+
+def find_touched_files(project_folder, test_file):
+    """Return the project files a test file imports with a relative path, relative to the project."""
+    test_path = os.path.join(project_folder, test_file.lstrip('/'))
+    with open(test_path, 'r', encoding='utf-8', errors='replace') as file:
+        content = file.read()
+
+    touched_files = []
+    for _, specifier in IMPORT_PATTERN.findall(content):
+        touched_file = resolve_import(project_folder, os.path.dirname(test_path), specifier)
+        if touched_file is not None and touched_file not in touched_files:
+            touched_files.append(touched_file)
+    return touched_files
+
+def get_jest_command(test_file, touched_files, output_folder):
+    """
+    Return the Jest command running a single test file, with the coverage of the
+    files it imports. Without any, the coverage scope of the project config is kept.
+    """
+    jest_command = [
+        'npx', 'jest', '--ci', '--runInBand',
+        '--json', f'--outputFile={os.path.join(output_folder, "results.json")}',
+        '--coverage', '--coverageReporters=json-summary',
+        f'--coverageDirectory={os.path.join(output_folder, "coverage")}',
+    ]
+    jest_command += [f'--collectCoverageFrom={touched_file}' for touched_file in touched_files]
+    return jest_command + ['--runTestsByPath', test_file.lstrip('/')]
+
+async def run_jest_async(project_folder, test_file):
+    """
+    Run Jest on a single test file of a project in project_folder, without
+    changing the working directory, and return its summary text. Reports go to
+    a temporary folder so several runs can overlap, even on the same project.
+    """
+    output_folder = tempfile.mkdtemp(prefix='jest_')
+    try:
+        jest_command = get_jest_command(test_file, find_touched_files(project_folder, test_file), output_folder)
+        log_info(f"Running command: {' '.join(jest_command)}")
+        process = await asyncio.create_subprocess_exec(
+            *jest_command,
+            cwd=project_folder,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        _, stderr = await process.communicate()
+
+        # Jest also exits with 1 when tests fail, which is still a result
+        results_file = os.path.join(output_folder, 'results.json')
+        if not os.path.exists(results_file):
+            log_error(f"Jest command failed with error:\n{stderr.decode()}")
+            raise subprocess.CalledProcessError(process.returncode, jest_command)
+
+        with open(results_file, 'r') as file:
+            results = json.load(file)
+        coverage_summary = None
+        coverage_file = os.path.join(output_folder, 'coverage', 'coverage-summary.json')
+        if os.path.exists(coverage_file):
+            with open(coverage_file, 'r') as file:
+                coverage_summary = json.load(file).get('total')
+        return format_summary_text(results, coverage_summary)
+    finally:
+        shutil.rmtree(output_folder, ignore_errors=True)
+
+async def run_tests(name_run, project_name, smell_number, llm, test_file=None):
+    """
+    Run the sample test file of the project and save its test summary in the
+    sample folder. The test file is read from dataset.csv when not given.
+    """
+    path_to_repository = validate_env_variable('PATH_TO_REPOSITORY')
+    if test_file is None:
+        test_file = get_sample_test_file(smell_number)
+
+    project_folder = path_to_repository + f'/projects/{project_name}'
+    summary_text = await run_jest_async(project_folder, test_file)
+
+    sample_folder = get_sample_folder(smell_number, llm)
+    os.makedirs(sample_folder, exist_ok=True)
+    destination_file = os.path.join(sample_folder, SUMMARY_FILES[name_run])
+    with open(destination_file, 'w') as file:
+        file.write(summary_text)
+    log_info(f"Test summary file created successfully at: {destination_file}")
+
+# Batch utilities
+def load_batch_jobs(manifest_path, llms, name_runs):
+    """Build one job per (llm, run, sample) listed in the dataset manifest."""
+    df = pd.read_csv(manifest_path, usecols=['Id', 'Repository', 'File'])
+
+    jobs = []
+    for llm in llms:
+        for name_run in name_runs:
+            for smell_number, repository, test_file in zip(df['Id'], df['Repository'], df['File']):
+                jobs.append({
+                    'llm': llm,
+                    'name_run': name_run,
+                    'smell_number': str(smell_number),
+                    'project_name': repository.split('/')[-1].lower(),
+                    'test_file': test_file,
+                    'status': 'pending',
+                    'attempts': 0,
+                    'duration': 0.0,
+                    'error': '',
+                })
+    return jobs
+
+def get_job_label(job):
+    """Return a short label identifying a job in the logs."""
+    return f"{job['llm']}/smell_{job['smell_number']} ({job['name_run']}, {job['project_name']})"
+
+def read_snuts_csv(snuts_csv):
+    """Read a Snuts.js CSV, failing on the error message the server sends instead of a CSV."""
+    try:
+        snutsjs_df = pd.read_csv(snuts_csv)
+    except pd.errors.EmptyDataError:
+        return pd.DataFrame(columns=['file', 'type', 'smells', 'itCount', 'describeCount'])
+    if 'file' not in snutsjs_df.columns:
+        raise RuntimeError(f"Snuts.js did not return a CSV: {', '.join(snutsjs_df.columns)}")
+    return snutsjs_df
+
+async def detect_smells(steel_target, snuts_directory, snuts_client):
+    """Run Steel and Snuts.js concurrently and load both reports as data frames."""
+    output_folder = tempfile.mkdtemp(prefix='detection_')
+    snuts_output_file = os.path.join(output_folder, 'snutsjs.csv')
+    try:
+        await asyncio.gather(
+            run_steel_tool_async(steel_target, output_folder),
+            run_snuts_js_directory(snuts_client, snuts_directory, snuts_output_file)
+        )
+        steel_json = os.path.join(output_folder, f'{get_steel_report_name()}.json')
+        steel_df = pd.DataFrame(iter_steel_json_rows(steel_json), columns=['file', 'type', 'smells', 'frame'])
+        snutsjs_df = read_snuts_csv(snuts_output_file)
+    finally:
+        shutil.rmtree(output_folder, ignore_errors=True)
+    return steel_df, snutsjs_df
+
+async def detect_project(project_name, snuts_client):
+    """Detect the smells of every test file of a project."""
+    projects_folder = validate_env_variable('PROJECTS_FOLDER')
+    log_info(f"Detecting smells for the whole project {project_name}")
+    return await detect_smells(
+        get_steel_project_target(project_name),
+        f'{projects_folder}{project_name}/',
+        snuts_client
+    )
 
-    directory_path = path_to_repository + f'/projects/{project_name}'
-    
-    os.chdir(directory_path)
-    log_info(f"Changed directory to {os.getcwd()}")
+async def detect_test_file(project_name, test_file, snuts_client):
+    """
+    Detect the smells of a single test file of a project. Snuts.js only
+    takes directories, so the file is mirrored alone into a temporary project.
+    """
+    projects_folder = validate_env_variable('PROJECTS_FOLDER')
+    snuts_project_folder = tempfile.mkdtemp(prefix='snutsjs_')
+    try:
+        mirrored_file = os.path.join(snuts_project_folder, project_name, test_file.lstrip('/'))
+        os.makedirs(os.path.dirname(mirrored_file), exist_ok=True)
+        shutil.copy(f'{projects_folder}{project_name}{test_file}', mirrored_file)
+        return await detect_smells(
+            get_steel_file_target(project_name, test_file),
+            os.path.join(snuts_project_folder, project_name) + '/',
+            snuts_client
+        )
+    finally:
+        shutil.rmtree(snuts_project_folder, ignore_errors=True)
+
+async def get_project_detection(project_name, context):
+    """
+    Return the whole-project detection, running it only once per project
+    for all the samples of a batch. Failed detections are dropped so a retry runs them again.
+    """
+    project_detections = context['project_detections']
+    task = project_detections.get(project_name)
+    if task is None:
+        task = asyncio.ensure_future(detect_project(project_name, context['snuts_client']))
+        project_detections[project_name] = task
+    try:
+        return await task
+    except Exception:
+        if project_detections.get(project_name) is task:
+            del project_detections[project_name]
+        raise
+
+def select_sample_smells(job, smells_df):
+    """Keep the smells of the sample test file."""
+    sample_file = job['test_file'][1:]  # Remove the first character from the file path
+    return smells_df[smells_df['file'].str.contains(sample_file, regex=False, na=False)]
+
+def get_detected_file_name(detector, job):
+    """Return the file name a detector reports for the sample test file."""
+    if detector == 'steel':
+        steel_tool_path = validate_env_variable('STEEL_DETECTION_TOOL_PATH')
+        steel_target = get_steel_file_target(job['project_name'], job['test_file'])
+        return os.path.normpath(os.path.join(steel_tool_path, steel_target))
+    return job['test_file'][1:]
+
+def get_detector_versions():
+    """Return the version of each detection tool, part of the cache keys."""
+    return {
+        'steel': get_tool_version(os.getenv('STEEL_DETECTION_TOOL_PATH', '')),
+        'snutsjs': get_tool_version(os.getenv('SNUTS_DETECTION_TOOL_PATH', '')),
+    }
 
-    log_info(f"Running command: {test_command}")
-    subprocess.run(test_command, shell=True, check=True)
+def load_cached_sample_smells(job, content_hash, context):
+    """Return the cached smells of the sample test file per detector, or None on any miss."""
+    cache = context['cache']
+    if cache is None or content_hash is None:
+        return None
 
-    log_info("Tests completed successfully.")
+    cached_rows = [
+        cache.get(detector, context['detector_versions'][detector], content_hash, ALL_SMELL_TYPES)
+        for detector in DETECTORS
+    ]
+    if any(rows is None for rows in cached_rows):
+        return None
+
+    sample_smells = []
+    for detector, rows in zip(DETECTORS, cached_rows):
+        smells_df = pd.DataFrame(rows)
+        smells_df.insert(0, 'file', get_detected_file_name(detector, job))
+        sample_smells.append(smells_df)
+    return sample_smells
+
+def store_cached_sample_smells(content_hash, sample_smells, context):
+    """Store the smells of the sample test file per detector."""
+    cache = context['cache']
+    if cache is None or content_hash is None:
+        return
 
-    # Copy the test_summary.txt to the output folder
-    test_summary_file = path_to_repository + f'/projects/{project_name}/test_summary.txt'
-    destination_folder = path_to_repository + f'/refactoring_data/{llm}/smell_{smell_number}/'
-    destination_file = os.path.join(destination_folder, f'{name_run}_test_summary.txt')
-    try:
-        if os.path.exists(test_summary_file):
-            shutil.copy(test_summary_file, destination_file)
-            log_info(f"Copied test summary file to: {destination_folder}")
-
-            # Delete the original test_summary.txt file
-            test_summary_file = path_to_repository + f'/projects/{project_name}/test_summary.txt'
-
-            if os.path.exists(test_summary_file):
-                os.remove(test_summary_file)
-                log_info(f"Deleted original test_summary.txt file: {test_summary_file}")
-            else:
-                log_info(f"Original test_summary.txt file not found, skipping deletion: {test_summary_file}")
-
-            # Delete the output_tests file
-            output_tests_file = path_to_repository + f'/projects/{project_name}/output_tests'
-            if os.path.exists(output_tests_file):
-                os.remove(output_tests_file)
-                log_info(f"Deleted output_tests file: {output_tests_file}")
-            else:
-                log_info(f"Output_tests file not found, skipping deletion: {output_tests_file}")
+    for detector, smells_df in zip(DETECTORS, sample_smells):
+        rows = smells_df.drop(columns=['file']).to_dict(orient='records')
+        cache.put(detector, context['detector_versions'][detector], content_hash, ALL_SMELL_TYPES, rows)
 
-        else:
-            log_error(f"Test summary file not found: {test_summary_file}")
-    except FileNotFoundError:
-        log_error(f"Test summary file not found: {test_summary_file}")
-    except Exception as e:
-        log_error(f"An error occurred while copying the test summary file: {e}")
+def finish_sample_job(job, sample_smells):
+    """Save the sample smells and copy its test file once both tools ran."""
+    combined_df = pd.concat(sample_smells, ignore_index=True)
+    output_file = get_sample_folder(job['smell_number'], job['llm']) + f"/{job['name_run']}_smells.csv"
+    combined_df.to_csv(output_file, index=False)
+    log_info(f"Sample smells CSV file created successfully at: {output_file}")
+
+    copy_test_file(job['name_run'], job['project_name'], job['smell_number'], job['llm'])
+
+async def run_sample_job(job, context):
+    """
+    Collect the smells of a sample. Test files already detected with the same
+    content are served from the cache. Otherwise the original side reuses a
+    single detection of the whole project and the refactored side only
+    detects the refactored test file.
+    """
+    if job['project_name'] not in PROJECTS_NAMES.values():
+        raise ValueError(f"Unknown project: {job['project_name']}")
+
+    os.makedirs(get_sample_folder(job['smell_number'], job['llm']), exist_ok=True)
+
+    projects_folder = validate_env_variable('PROJECTS_FOLDER')
+    source_file = f"{projects_folder}{job['project_name']}{job['test_file']}"
+    content_hash = hash_file(source_file) if os.path.exists(source_file) else None
 
+    sample_smells = load_cached_sample_smells(job, content_hash, context)
+    if sample_smells is None:
+        if job['name_run'] == 'original':
+            detection = await get_project_detection(job['project_name'], context)
+        else:
+            detection = await detect_test_file(job['project_name'], job['test_file'], context['snuts_client'])
+        sample_smells = [select_sample_smells(job, smells_df) for smells_df in detection]
+        store_cached_sample_smells(content_hash, sample_smells, context)
+    else:
+        log_info(f"Using cached detections for {get_job_label(job)}")
+
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, finish_sample_job, job, sample_smells)
+
+async def run_test_job(job, context):
+    """Run the sample test file in its project and save the test summary."""
+    if job['project_name'] not in PROJECTS_NAMES.values():
+        raise ValueError(f"Unknown project: {job['project_name']}")
+    await run_tests(job['name_run'], job['project_name'], job['smell_number'], job['llm'], job['test_file'])
+
+async def run_job_with_retries(job, semaphore, retries, context):
+    """
+    Run a job inside the worker pool, retrying failed attempts with backoff.
+    The worker slot is released during the backoff so other jobs can use it.
+    """
+    start = None
+    while job['attempts'] <= retries:
+        async with semaphore:
+            if start is None:
+                start = time.monotonic()
+            job['status'] = 'running'
+            job['attempts'] += 1
+            log_info(f"Starting {get_job_label(job)}, attempt {job['attempts']}")
+            try:
+                await context['run_job'](job, context)
+                job['status'] = 'done'
+                job['error'] = ''
+                log_info(f"Finished {get_job_label(job)}")
+            except Exception as e:
+                job['status'] = 'failed'
+                job['error'] = str(e)
+                log_error(f"Failed {get_job_label(job)}, attempt {job['attempts']}: {e}")
+
+        if job['status'] == 'done':
+            break
+        if job['attempts'] <= retries:
+            await asyncio.sleep(2 ** (job['attempts'] - 1))
+
+    job['duration'] = time.monotonic() - start
+
+def print_batch_summary(jobs, elapsed):
+    """Print the status of every job and the totals of the batch run."""
+    done = [job for job in jobs if job['status'] == 'done']
+    failed = [job for job in jobs if job['status'] != 'done']
+
+    print()
+    print(f"{'Job':<60} {'Status':<8} {'Attempts':>8} {'Time (s)':>9}")
+    for job in jobs:
+        print(f"{get_job_label(job):<60} {job['status']:<8} {job['attempts']:>8} {job['duration']:>9.1f}")
+
+    print()
+    log_info(f"Batch finished in {elapsed:.1f}s: {len(done)} done, {len(failed)} failed, {len(jobs)} total")
+    for job in failed:
+        log_error(f"{get_job_label(job)}: {job['error']}")
+
+async def run_batch(manifest_path, llms, name_runs, workers, retries, cache=None, tests=False):
+    """
+    Run every sample of the manifest across a bounded pool of workers, detecting
+    its smells or, with tests, running its test file.
+    """
+    jobs = load_batch_jobs(manifest_path, llms, name_runs)
+    log_info(f"Loaded {len(jobs)} jobs from {manifest_path}, running with {workers} workers")
+
+    semaphore = asyncio.Semaphore(workers)
+    context = {
+        'run_job': run_test_job if tests else run_sample_job,
+        'project_detections': {},
+        'cache': cache,
+        'detector_versions': get_detector_versions(),
+        'snuts_client': SnutsClient(concurrency=workers),
+    }
+    start = time.monotonic()
+    try:
+        await asyncio.gather(*(
+            run_job_with_retries(job, semaphore, retries, context) for job in jobs
+        ))
+    finally:
+        context['snuts_client'].close()
+    print_batch_summary(jobs, time.monotonic() - start)
+    if cache is not None:
+        log_info(cache.report())
+
+    return all(job['status'] == 'done' for job in jobs)
+
+def parse_arguments():
+    """Parse the command line arguments of the batch mode."""
+    parser = argparse.ArgumentParser(description="Run the detection tools for the research samples.")
+    parser.add_argument('--batch', metavar='MANIFEST',
+                        help="dataset CSV with Id and Repository columns, e.g. scripts/assets/dataset.csv; "
+                             "without it the script runs interactively for a single sample")
+    parser.add_argument('--llm', action='append', choices=['copilot', 'whisper'],
+                        help="LLM folder to generate (repeatable, default: both)")
+    parser.add_argument('--run', action='append', choices=['original', 'refactored'],
+                        help="side of the samples to generate (repeatable, default: original)")
+    parser.add_argument('--workers', type=int, default=4, help="number of samples processed at once")
+    parser.add_argument('--retries', type=int, default=2, help="retries of a failed sample")
+    parser.add_argument('--cache', default=os.getenv('DETECTION_CACHE_PATH', ''),
+                        help="detection cache file (default: DETECTION_CACHE_PATH or "
+                             "scripts/.detection_cache.sqlite in the repository)")
+    parser.add_argument('--cache-max-mb', type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help="size of the detection cache before old entries are evicted")
+    parser.add_argument('--no-cache', action='store_true', help="detect every sample again")
+    parser.add_argument('--tests', action='store_true',
+                        help="run the test file of each sample with Jest and save its test summary "
+                             "instead of running the detection tools")
+    return parser.parse_args()
 
 # Main function
 async def main():
+    args = parse_arguments()
+    if args.batch:
+        cache = None
+        if not args.no_cache and not args.tests:
+            cache_path = args.cache or validate_env_variable('PATH_TO_REPOSITORY') + '/scripts/.detection_cache.sqlite'
+            cache = DetectionCache(cache_path, args.cache_max_mb * 1024 * 1024)
+        try:
+            succeeded = await run_batch(
+                args.batch,
+                args.llm or ['copilot', 'whisper'],
+                args.run or ['original'],
+                max(1, args.workers),
+                max(0, args.retries),
+                cache,
+                args.tests
+            )
+        finally:
+            if cache is not None:
+                cache.close()
+        if not succeeded:
+            sys.exit(1)
+        return
+
     # llm = 'copilot'
     llm = 'whisper'
-    
-    projects_names = {
-        1: 'vanilla-lazyload',
-        2: 'binance-trading-bot',
-        3: 'prettier',
-        4: 'react-beautiful-dnd',
-        5: 'intl-tel-input',
-        6: 'miragejs',
-        7: 'surfingkeys',
-        8: 'tether',
-        9: 'katex',
-        10: 'serverless-express',
-    }
+    projects_names = PROJECTS_NAMES
 
     type_of_run = input("Enter the type of run (1 for original, 2 for refactored): ").strip()
     print("Available projects:")
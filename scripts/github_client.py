@@ -0,0 +1,158 @@
+# ----------------------------------------------------------------------------------------
+# HTTP client for the GitHub REST API shared by the threads of filter_script.py.
+# Requests reuse a keep-alive connection pool, server errors are retried with
+# exponential backoff, and the X-RateLimit-Remaining/X-RateLimit-Reset headers are
+# followed so every thread pauses until the reset once the rate limit is exhausted.
+# JSON responses can be kept in a ResponseCache and revalidated with conditional requests.
+# ----------------------------------------------------------------------------------------
+
+import os
+import time
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from http_cache import CacheMissError
+
+# Default GitHub API base URL
+DEFAULT_GITHUB_API_URL = "https://api.github.com"
+
+class GitHubClient:
+    """Thread safe, rate limit aware client for the GitHub REST API."""
+
+    def __init__(self, token=None, base_url=None, pool_size=8, timeout=(5, 30), retries=3, backoff=1.0,
+                 cache=None):
+        self.base_url = (base_url or os.getenv('GITHUB_API_URL', DEFAULT_GITHUB_API_URL)).rstrip('/')
+        self.cache = cache
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['Accept'] = 'application/vnd.github+json'
+        # Only sent to the API, not to the download_url of raw.githubusercontent.com
+        self.auth_headers = {'Authorization': f"token {token}"} if token else {}
+
+        # Rate limit state shared by all threads
+        self.lock = threading.Lock()
+        self.remaining = None
+        self.reset_at = 0.0
+
+    def wait_for_rate_limit(self):
+        """Block while the rate limit is exhausted, until its reset time."""
+        while True:
+            with self.lock:
+                if self.remaining is None or self.remaining > 0:
+                    return
+                delay = self.reset_at - time.time()
+                if delay <= 0:
+                    # The window is over, let the next response tell the new budget
+                    self.remaining = None
+                    return
+            print(f"[INFO] GitHub rate limit exhausted, waiting {delay:.0f}s for the reset")
+            time.sleep(min(delay, 60))
+
+    def update_rate_limit(self, response):
+        """Record the rate limit budget announced by a response."""
+        remaining = response.headers.get('X-RateLimit-Remaining')
+        reset = response.headers.get('X-RateLimit-Reset')
+        if remaining is None:
+            return
+        with self.lock:
+            self.remaining = int(remaining)
+            if reset is not None:
+                self.reset_at = float(reset)
+
+    def is_rate_limited(self, response):
+        """Tell whether a 403/429 response was caused by the rate limit."""
+        if response.status_code not in (403, 429):
+            return False
+        return response.headers.get('X-RateLimit-Remaining') == '0' or 'Retry-After' in response.headers
+
+    def get_url(self, url):
+        """Return the absolute URL of a path relative to the API."""
+        if url.startswith('http'):
+            return url
+        return f"{self.base_url}/{url.lstrip('/')}"
+
+    def is_api_url(self, url):
+        """Tell whether an absolute URL belongs to the API, which gets the token."""
+        return url == self.base_url or url.startswith(self.base_url + '/')
+
+    def get(self, url, headers=None, **kwargs):
+        """GET a URL (absolute or relative to the API) with retries; raises on errors other than 404."""
+        url = self.get_url(url)
+        if self.is_api_url(url):
+            headers = dict(headers or {}, **self.auth_headers)
+
+        attempt = 0
+        while True:
+            self.wait_for_rate_limit()
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                attempt += 1
+                if attempt > self.retries:
+                    raise
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+                continue
+
+            self.update_rate_limit(response)
+            if self.is_rate_limited(response):
+                # Secondary rate limits only tell how long to wait
+                retry_after = float(response.headers.get('Retry-After', 60))
+                with self.lock:
+                    self.remaining = 0
+                    if 'Retry-After' in response.headers or self.reset_at <= time.time():
+                        self.reset_at = max(self.reset_at, time.time() + retry_after)
+                continue
+            if response.status_code >= 500:
+                attempt += 1
+                if attempt > self.retries:
+                    response.raise_for_status()
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+                continue
+
+            if response.status_code != 404:
+                response.raise_for_status()
+            return response
+
+    def get_json(self, url, headers=None):
+        """
+        GET a URL and return its JSON body, or None when it does not exist.
+        With a response cache, fresh entries are served without a request and
+        stale ones are revalidated with their ETag/Last-Modified.
+        """
+        url = self.get_url(url)
+        headers = dict(headers or {})
+        entry = None
+        if self.cache is not None:
+            entry = self.cache.get(url)
+            if entry is not None and (self.cache.offline or self.cache.is_fresh(entry)):
+                self.cache.count('fresh')
+                return entry['body']
+            if self.cache.offline:
+                self.cache.count('missed')
+                raise CacheMissError(f"{url} is not cached and the cache is offline")
+            if entry is not None:
+                headers.update(self.cache.get_validators(entry))
+
+        response = self.get(url, headers=headers)
+        if response.status_code == 304 and entry is not None:
+            self.cache.touch(url)
+            self.cache.count('revalidated')
+            return entry['body']
+
+        body = None if response.status_code == 404 else response.json()
+        if self.cache is not None:
+            self.cache.put(
+                url, response.status_code, body,
+                response.headers.get('ETag'), response.headers.get('Last-Modified')
+            )
+            self.cache.count('updated' if entry is not None else 'missed')
+        return body
+
+    def close(self):
+        """Close the pooled connections."""
+        self.session.close()
@@ -0,0 +1,175 @@
+# ----------------------------------------------------------------------------------------
+# Local stand-in for the GitHub REST API, used to try filter_script.py without a
+# token or network. It answers the languages, package.json contents and repository
+# endpoints, enforces a small rate limit with the X-RateLimit headers, and can fail
+# a share of the requests with 502 to exercise the retries of the client. Responses
+# carry an ETag and conditional requests that match it are answered with 304.
+#
+# Usage: python github_stub_server.py --port 3002 --rate-limit 100 --window 10 --fail-every 7
+#        python filter_script.py --api-url http://127.0.0.1:3002 --input ../datasets/repositories.csv
+# ----------------------------------------------------------------------------------------
+
+import csv
+import sys
+import json
+import time
+import base64
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def load_repositories(repositories_csv):
+    """Return the languages and license of each repository of a repositories.csv file."""
+    csv.field_size_limit(sys.maxsize)
+    repositories = {}
+    with open(repositories_csv, 'r', encoding='utf-8') as csv_file:
+        for row in csv.DictReader(csv_file):
+            repositories[row['name'].lower()] = {
+                'languages': json.loads(row['languages'] or '{}'),
+                'license': row['license'] or None,
+            }
+    return repositories
+
+def generate_repository(full_name):
+    """Return stable made up data for a repository that is not in the CSV."""
+    seed = int(hashlib.sha256(full_name.encode('utf-8')).hexdigest(), 16)
+    return {
+        'languages': {'JavaScript': seed % 100000, 'TypeScript': (seed >> 20) % 50000, 'CSS': (seed >> 40) % 5000},
+        'license': ['MIT License', 'Apache License 2.0', None][seed % 3],
+    }
+
+def generate_package_json(full_name):
+    """Return a package.json with a test framework chosen from the repository name."""
+    frameworks = ['jest', 'mocha', 'jasmine', 'ava', 'cypress', None]
+    framework = frameworks[int(hashlib.md5(full_name.encode('utf-8')).hexdigest(), 16) % len(frameworks)]
+    dev_dependencies = {'eslint': '^8.0.0'}
+    if framework:
+        dev_dependencies[framework] = '^1.0.0'
+    return {'name': full_name.split('/')[-1], 'devDependencies': dev_dependencies}
+
+class GitHubStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            print(f"[STUB] {self.address_string()} {format % args}")
+
+    def send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode('utf-8')
+        if status == 200:
+            etag = '"' + hashlib.sha1(data).hexdigest() + '"'
+            headers = dict(headers or {}, ETag=etag, **{'Last-Modified': self.server.last_modified})
+            if self.headers.get('If-None-Match') == etag:
+                # Conditional requests answered with 304 do not count against the rate limit
+                with self.server.lock:
+                    self.server.window_remaining += 1
+                    self.server.not_modified += 1
+                    headers['X-RateLimit-Remaining'] = str(self.server.window_remaining)
+                self.send_response(304)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                return
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def consume_rate_limit(self):
+        """Spend one request of the current window and return the rate limit headers."""
+        server = self.server
+        with server.lock:
+            now = time.time()
+            if now >= server.window_reset:
+                server.window_reset = now + server.window
+                server.window_remaining = server.rate_limit
+            server.requests += 1
+            request_number = server.requests
+            allowed = server.window_remaining > 0
+            if allowed:
+                server.window_remaining -= 1
+            headers = {
+                'X-RateLimit-Limit': str(server.rate_limit),
+                'X-RateLimit-Remaining': str(server.window_remaining),
+                'X-RateLimit-Reset': str(int(server.window_reset) + 1),
+            }
+        return allowed, request_number, headers
+
+    def do_GET(self):
+        server = self.server
+        allowed, request_number, headers = self.consume_rate_limit()
+        if not allowed:
+            server.rejected += 1
+            self.send_json(403, {"message": "API rate limit exceeded"}, headers)
+            return
+        if server.fail_every and request_number % server.fail_every == 0:
+            self.send_json(502, {"message": "Server Error"}, headers)
+            return
+
+        time.sleep(server.delay)
+        parts = self.path.split('?')[0].strip('/').split('/')
+        if len(parts) < 3 or parts[0] != 'repos':
+            self.send_json(404, {"message": "Not Found"}, headers)
+            return
+
+        full_name = f"{parts[1]}/{parts[2]}"
+        repository = server.repositories.get(full_name.lower()) or generate_repository(full_name)
+        endpoint = '/'.join(parts[3:])
+        if endpoint == '':
+            license_info = {'name': repository['license']} if repository['license'] else None
+            self.send_json(200, {'full_name': full_name, 'license': license_info}, headers)
+        elif endpoint == 'languages':
+            self.send_json(200, repository['languages'], headers)
+        elif endpoint == 'contents/package.json':
+            content = json.dumps(generate_package_json(full_name)).encode('utf-8')
+            self.send_json(200, {
+                'name': 'package.json',
+                'encoding': 'base64',
+                'content': base64.b64encode(content).decode('ascii'),
+                'download_url': None,
+            }, headers)
+        else:
+            self.send_json(404, {"message": "Not Found"}, headers)
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stub of the GitHub REST API.")
+    parser.add_argument('--port', type=int, default=3002)
+    parser.add_argument('--repositories', help="repositories.csv whose languages and licenses are served")
+    parser.add_argument('--rate-limit', type=int, default=5000, help="requests allowed per window")
+    parser.add_argument('--window', type=float, default=3600, help="seconds of a rate limit window")
+    parser.add_argument('--fail-every', type=int, default=0, help="answer 502 to every Nth request")
+    parser.add_argument('--delay', type=float, default=0.0, help="seconds to wait before answering")
+    parser.add_argument('--verbose', action='store_true', help="log every request")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), GitHubStubHandler)
+    server.repositories = load_repositories(args.repositories) if args.repositories else {}
+    server.rate_limit = args.rate_limit
+    server.window = args.window
+    server.window_reset = 0.0
+    server.window_remaining = 0
+    server.fail_every = args.fail_every
+    server.delay = args.delay
+    server.verbose = args.verbose
+    server.requests = 0
+    server.rejected = 0
+    server.not_modified = 0
+    server.last_modified = time.strftime('%a, %d %b %Y %H:%M:%S GMT', time.gmtime())
+    server.lock = threading.Lock()
+
+    print(f"[STUB] GitHub API stub listening on http://127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"[STUB] {server.requests} requests, {server.rejected} rejected by the rate limit, "
+              f"{server.not_modified} not modified")
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# ----------------------------------------------------------------------------------------
+# On-disk cache of HTTP JSON responses keyed by URL. Each entry keeps the ETag and
+# Last-Modified validators of the response, so stale entries are revalidated with
+# a conditional request and a 304 answer is served from disk. Entries younger than
+# the max age are served without any request, and the offline mode never sends one.
+# ----------------------------------------------------------------------------------------
+
+import os
+import json
+import time
+import sqlite3
+import threading
+
+# Default age after which a cached response is revalidated (one day)
+DEFAULT_MAX_AGE = 24 * 60 * 60
+
+class CacheMissError(Exception):
+    """Raised when the offline mode needs a response that is not cached."""
+
+class ResponseCache:
+    """SQLite backed cache of the JSON responses of an API."""
+
+    def __init__(self, path, max_age=DEFAULT_MAX_AGE, offline=False):
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+
+        self.path = path
+        self.max_age = max_age
+        self.offline = offline
+        self.counters = {'fresh': 0, 'revalidated': 0, 'updated': 0, 'missed': 0}
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            'url TEXT PRIMARY KEY, '
+            'status INTEGER NOT NULL, '
+            'etag TEXT, '
+            'last_modified TEXT, '
+            'body TEXT, '
+            'fetched_at REAL NOT NULL)'
+        )
+        self.connection.commit()
+
+    def get(self, url):
+        """Return the cached entry of a URL as a dict, or None when it is not cached."""
+        with self.lock:
+            entry = self.connection.execute(
+                'SELECT status, etag, last_modified, body, fetched_at FROM responses WHERE url = ?', (url,)
+            ).fetchone()
+        if entry is None:
+            return None
+        status, etag, last_modified, body, fetched_at = entry
+        return {
+            'status': status,
+            'etag': etag,
+            'last_modified': last_modified,
+            'body': json.loads(body) if body is not None else None,
+            'fetched_at': fetched_at,
+        }
+
+    def is_fresh(self, entry):
+        """Tell whether an entry can be served without revalidation."""
+        return time.time() - entry['fetched_at'] < self.max_age
+
+    def get_validators(self, entry):
+        """Return the conditional request headers of an entry."""
+        headers = {}
+        if entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def put(self, url, status, body, etag=None, last_modified=None):
+        """Store the response of a URL."""
+        serialized_body = json.dumps(body) if body is not None else None
+        with self.lock:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO responses (url, status, etag, last_modified, body, fetched_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (url, status, etag, last_modified, serialized_body, time.time())
+            )
+            self.connection.commit()
+
+    def touch(self, url):
+        """Mark a revalidated entry as fresh again."""
+        with self.lock:
+            self.connection.execute('UPDATE responses SET fetched_at = ? WHERE url = ?', (time.time(), url))
+            self.connection.commit()
+
+    def count(self, counter):
+        with self.lock:
+            self.counters[counter] += 1
+
+    def report(self):
+        """Return a line with the number of responses served by each path."""
+        return (
+            f"HTTP cache: {self.counters['fresh']} fresh, {self.counters['revalidated']} revalidated (304), "
+            f"{self.counters['updated']} updated, {self.counters['missed']} missed"
+        )
+
+    def close(self):
+        """Close the connection to the cache."""
+        with self.lock:
+            self.connection.close()
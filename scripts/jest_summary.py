@@ -0,0 +1,184 @@
+# ----------------------------------------------------------------------------------------
+# Parser of the Jest summaries saved in refactoring_data/<tool>/smell_N/. A summary is read
+# once and every line is recognized by its label ("Test Suites:", "Tests:", "Snapshots:",
+# "Time:", "Statements", "Branches", "Functions", "Lines"), wherever it is, into a typed
+# record. The batch mode parses all the summaries in parallel into one table.
+#
+# Usage: python jest_summary.py [--output summaries.csv] [--workers 4]
+# ----------------------------------------------------------------------------------------
+
+import io
+import os
+import re
+import argparse
+import dataclasses
+from dataclasses import dataclass
+from typing import Optional
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Root of the research repository (refactoring_data/)
+REPOSITORY_PATH = os.getenv(
+    "PATH_TO_REPOSITORY",
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
+# Summary file of each side of a sample (the original one is plural), read by
+# check_smells.py and results_store.py and written by generate_data_script.py
+SUMMARY_FILES = {"original": "original_tests_summary.txt", "refactored": "refactored_test_summary.txt"}
+
+# Counter lines of Jest and the prefix of their fields in JestSummary
+COUNT_LABELS = {"Test Suites": "suites", "Tests": "tests", "Snapshots": "snapshots"}
+
+COVERAGE_LABELS = {"Statements": "statements", "Branches": "branches", "Functions": "functions", "Lines": "lines"}
+
+COUNT_PATTERN = re.compile(r"(\d+)\s+(passed|failed|skipped|todo|total)")
+PERCENT_PATTERN = re.compile(r"([\d.]+)%")
+TIME_PATTERN = re.compile(r"([\d.]+)\s*(ms|s)\b")
+
+@dataclass
+class JestSummary:
+    """Results and coverage of one Jest run. Counts missing from the summary are 0,
+    the time and coverage are None when the summary does not report them."""
+    suites_passed: int = 0
+    suites_failed: int = 0
+    suites_total: int = 0
+    tests_passed: int = 0
+    tests_failed: int = 0
+    tests_skipped: int = 0
+    tests_todo: int = 0
+    tests_total: int = 0
+    snapshots_passed: int = 0
+    snapshots_total: int = 0
+    time_seconds: Optional[float] = None
+    statements: Optional[float] = None
+    branches: Optional[float] = None
+    functions: Optional[float] = None
+    lines: Optional[float] = None
+    # Sections of the file as copied to the "Test before/after" and "Coverage
+    # before/after" columns of the Refactor datasets
+    test_section: str = ""
+    coverage_section: str = ""
+
+    @property
+    def passed(self):
+        """Passed suites and tests, the number compared to detect changed results."""
+        return self.suites_passed + self.tests_passed
+
+    @property
+    def coverage(self):
+        """The four coverage percentages, 0.0 when missing."""
+        return {label: getattr(self, field) or 0.0 for label, field in COVERAGE_LABELS.items()}
+
+def parse_summary_text(text):
+    """Parse the content of a summary file in a single pass over its lines."""
+    summary = JestSummary()
+    lines = io.StringIO(text).readlines()
+    for line in lines:
+        label, separator, value = line.partition(":")
+        if not separator:
+            continue
+        label = label.strip()
+        if label in COUNT_LABELS:
+            prefix = COUNT_LABELS[label]
+            for count, status in COUNT_PATTERN.findall(value):
+                field = f"{prefix}_{status}"
+                if hasattr(summary, field):
+                    setattr(summary, field, int(count))
+        elif label in COVERAGE_LABELS:
+            match = PERCENT_PATTERN.search(value)
+            if match:
+                setattr(summary, COVERAGE_LABELS[label], float(match.group(1)))
+        elif label == "Time":
+            match = TIME_PATTERN.search(value)
+            if match:
+                seconds = float(match.group(1))
+                summary.time_seconds = seconds / 1000 if match.group(2) == "ms" else seconds
+
+    # Same slices as the Refactor datasets have always stored
+    summary.test_section = "".join(lines[1:5]).strip()
+    summary.coverage_section = "".join(lines[8:12])
+    return summary
+
+def format_summary_text(results, coverage_summary):
+    """
+    Write the summary of a Jest run from its --json results and the total of its
+    json-summary coverage report (None when no file was covered), in the format
+    of projects/vanilla-lazyload/test-summary.js.
+    """
+    runtime = sum(result.get("perfStats", {}).get("runtime", 0) for result in results.get("testResults", [])) / 1000
+    coverage = coverage_summary or {}
+    percents = dict(
+        (label, coverage.get(field, {}).get("pct") or 0) for label, field in COVERAGE_LABELS.items()
+    )
+    return (
+        "\n"
+        f"Test Suites: {results.get('numPassedTestSuites') or 0} passed, {results.get('numTotalTestSuites') or 0} total\n"
+        f"Tests:       {results.get('numPassedTests') or 0} passed, {results.get('numTotalTests') or 0} total\n"
+        f"Snapshots:   {results.get('snapshot', {}).get('total') or 0} total\n"
+        f"Time:        {runtime:.2f}s\n"
+        "Ran all test suites.\n"
+        "\n"
+        "Total Coverage:\n"
+        + "".join(f"{label}: {percent}%\n" for label, percent in percents.items())
+    )
+
+def parse_summary_file(file_path):
+    """Parse a summary file, or return None when it does not exist."""
+    try:
+        with open(file_path, "r") as file:
+            return parse_summary_text(file.read())
+    except FileNotFoundError:
+        return None
+
+def list_summary_files(repository_path):
+    """Return (tool, smell_id, side, path) for every summary file in refactoring_data/."""
+    summary_files = []
+    refactoring_folder = os.path.join(repository_path, "refactoring_data")
+    for tool in sorted(os.listdir(refactoring_folder)):
+        tool_folder = os.path.join(refactoring_folder, tool)
+        for sample_name in sorted(os.listdir(tool_folder)):
+            if not sample_name.startswith("smell_"):
+                continue
+            for side, file_name in SUMMARY_FILES.items():
+                path = os.path.join(tool_folder, sample_name, file_name)
+                if os.path.exists(path):
+                    summary_files.append((tool, int(sample_name[len("smell_"):]), side, path))
+    return summary_files
+
+def parse_summary_row(summary_file):
+    tool, smell_id, side, path = summary_file
+    record = dataclasses.asdict(parse_summary_file(path))
+    return dict(tool=tool, smell_id=smell_id, side=side, **record)
+
+def load_summaries_frame(repository_path, workers=1):
+    """Parse every summary of refactoring_data/ into one frame, one row per (tool, smell_id, side)."""
+    summary_files = list_summary_files(repository_path)
+    if workers <= 1:
+        rows = list(map(parse_summary_row, summary_files))
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            rows = list(executor.map(parse_summary_row, summary_files, chunksize=32))
+    columns = ["tool", "smell_id", "side"] + [field.name for field in dataclasses.fields(JestSummary)]
+    return pd.DataFrame(rows, columns=columns)
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse all the Jest summaries of refactoring_data/ into one table.")
+    parser.add_argument('--output', default=os.path.join(REPOSITORY_PATH, "scripts", "assets", "test_summaries.csv"),
+                        help="CSV file of the parsed summaries (default: scripts/assets/test_summaries.csv)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="processes parsing the summaries (1 parses them in this process)")
+    args = parser.parse_args()
+
+    summaries = load_summaries_frame(REPOSITORY_PATH, args.workers)
+    summaries.drop(columns=["test_section", "coverage_section"]).to_csv(args.output, index=False)
+
+    missing = summaries[["statements", "branches", "functions", "lines"]].isna().any(axis=1).sum()
+    print(f"Parsed {len(summaries)} summaries into {args.output} ({missing} without full coverage)")
+
+if __name__ == "__main__":
+    main()
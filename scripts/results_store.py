@@ -0,0 +1,276 @@
+# ----------------------------------------------------------------------------------------
+# Consolidated store of the study results. The ingest command compacts the smells and
+# test summaries of every refactoring_data/<tool>/smell_N sample, and the reports in
+# smells_detected/<detector>/<project>, into one indexed SQLite file. The analyses then
+# query it instead of globbing and parsing hundreds of small CSV and TXT files.
+#
+# File paths are stored once in a files table and referenced by id, and the code frames
+# of the smells are not kept since no analysis reads them.
+#
+# Usage: python results_store.py ingest [--db PATH]
+#        python results_store.py info [--db PATH]
+#        python check_smells.py --store PATH
+# ----------------------------------------------------------------------------------------
+
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import pandas as pd
+from dotenv import load_dotenv
+from jest_summary import SUMMARY_FILES
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Root of the research repository (refactoring_data/ and smells_detected/)
+REPOSITORY_PATH = os.getenv(
+    "PATH_TO_REPOSITORY",
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
+# Default location of the store
+DEFAULT_STORE_PATH = os.path.join(REPOSITORY_PATH, "scripts", ".results_store.sqlite")
+
+# Each sample is detected and tested twice: before and after the LLM refactoring
+SIDES = ["original", "refactored"]
+
+# Columns of the smell CSVs kept in the store
+SMELL_COLUMNS = ["file", "type", "smells", "itCount", "describeCount"]
+
+SCHEMA = [
+    'CREATE TABLE files (id INTEGER PRIMARY KEY, path TEXT NOT NULL UNIQUE)',
+    'CREATE TABLE samples ('
+    'tool TEXT NOT NULL, smell_id INTEGER NOT NULL, has_smells INTEGER NOT NULL, '
+    'PRIMARY KEY (tool, smell_id))',
+    'CREATE TABLE smells ('
+    'tool TEXT NOT NULL, smell_id INTEGER NOT NULL, side TEXT NOT NULL, '
+    'file_id INTEGER REFERENCES files (id), type TEXT, location TEXT, '
+    'it_count INTEGER, describe_count INTEGER)',
+    'CREATE INDEX smells_sample ON smells (tool, smell_id, side)',
+    'CREATE INDEX smells_type ON smells (tool, type)',
+    'CREATE TABLE test_summaries ('
+    'tool TEXT NOT NULL, smell_id INTEGER NOT NULL, side TEXT NOT NULL, text TEXT NOT NULL, '
+    'PRIMARY KEY (tool, smell_id, side))',
+    'CREATE TABLE detections ('
+    'detector TEXT NOT NULL, project TEXT NOT NULL, report TEXT NOT NULL, '
+    'file_id INTEGER REFERENCES files (id), type TEXT, location TEXT, '
+    'it_count INTEGER, describe_count INTEGER)',
+    'CREATE INDEX detections_project ON detections (detector, project)',
+    'CREATE TABLE metadata (key TEXT PRIMARY KEY, value TEXT)',
+]
+
+def read_smells_csv(smells_path):
+    """Read the kept columns of a smells CSV, None where a column is missing."""
+    smells = pd.read_csv(smells_path, usecols=lambda column: column in SMELL_COLUMNS)
+    smells = smells.reindex(columns=SMELL_COLUMNS)
+    return smells.astype(object).where(smells.notna(), None)
+
+def to_int(value):
+    return int(value) if value is not None else None
+
+class ResultsStore:
+    """Indexed SQLite store of the smells and test summaries of the study."""
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Results store not found: {path}. Run 'python results_store.py ingest' first")
+        self.path = path
+        self.connection = sqlite3.connect(path)
+
+    def close(self):
+        self.connection.close()
+
+    def get_metadata(self):
+        return dict(self.connection.execute('SELECT key, value FROM metadata'))
+
+    def get_complete_samples(self, tools):
+        """Return the set of (tool, smell_id) whose both smell CSVs were found."""
+        placeholders = ','.join('?' * len(tools))
+        return set(self.connection.execute(
+            f'SELECT tool, smell_id FROM samples WHERE has_smells = 1 AND tool IN ({placeholders})', list(tools)
+        ))
+
+    def load_smells_frame(self, tools):
+        """
+        Return the smells of the samples of the given tools as a long-format frame with the
+        columns tool, smell_id, side, file and type, and the set of (tool, smell_id) having
+        both sides, like check_smells.load_smells_frame does from the CSV files.
+        """
+        placeholders = ','.join('?' * len(tools))
+        smells_frame = pd.read_sql_query(
+            'SELECT smells.tool, smells.smell_id, smells.side, files.path AS file, smells.type '
+            'FROM smells LEFT JOIN files ON files.id = smells.file_id '
+            f'WHERE smells.tool IN ({placeholders})',
+            self.connection, params=list(tools)
+        )
+        return smells_frame, self.get_complete_samples(tools)
+
+    def load_smell_counts(self, tools):
+        """
+        Like load_smells_frame, with the smells of a sample side, file and type counted
+        into one row with a count column. This is a fraction of the rows to compare.
+        """
+        placeholders = ','.join('?' * len(tools))
+        smell_counts = pd.read_sql_query(
+            'SELECT counts.tool, counts.smell_id, counts.side, files.path AS file, counts.type, counts.count '
+            'FROM (SELECT tool, smell_id, side, file_id, type, COUNT(*) AS count FROM smells '
+            f'WHERE tool IN ({placeholders}) GROUP BY tool, smell_id, side, file_id, type) AS counts '
+            'LEFT JOIN files ON files.id = counts.file_id',
+            self.connection, params=list(tools)
+        )
+        return smell_counts, self.get_complete_samples(tools)
+
+    def get_test_summaries(self, tool):
+        """Return {(smell_id, side): summary text} for the samples of a tool."""
+        return dict(((smell_id, side), text) for smell_id, side, text in self.connection.execute(
+            'SELECT smell_id, side, text FROM test_summaries WHERE tool = ?', (tool,)
+        ))
+
+    def load_detections_frame(self, detector=None, project=None, report=None):
+        """Return the smells reported in smells_detected/, optionally for one detector, project or report."""
+        conditions = []
+        params = []
+        for column, value in (("detector", detector), ("project", project), ("report", report)):
+            if value is not None:
+                conditions.append(f"detections.{column} = ?")
+                params.append(value)
+        where = ' WHERE ' + ' AND '.join(conditions) if conditions else ''
+        return pd.read_sql_query(
+            'SELECT detections.detector, detections.project, detections.report, files.path AS file, '
+            'detections.type, detections.location, detections.it_count, detections.describe_count '
+            f'FROM detections LEFT JOIN files ON files.id = detections.file_id{where}',
+            self.connection, params=params
+        )
+
+class StoreWriter:
+    """Build a new store, keeping a dictionary of the file paths."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.file_ids = {}
+
+    def get_file_id(self, path):
+        if path is None:
+            return None
+        file_id = self.file_ids.get(path)
+        if file_id is None:
+            file_id = self.file_ids[path] = len(self.file_ids) + 1
+            self.connection.execute('INSERT INTO files (id, path) VALUES (?, ?)', (file_id, path))
+        return file_id
+
+    def get_rows(self, smells):
+        return [
+            (self.get_file_id(file), smell_type, location, to_int(it_count), to_int(describe_count))
+            for file, smell_type, location, it_count, describe_count in smells.itertuples(index=False)
+        ]
+
+    def add_sample(self, tool, smell_id, sample_folder):
+        """Store the smells and test summaries of a sample. Returns the number of smells stored."""
+        smell_paths = [os.path.join(sample_folder, f"{side}_smells.csv") for side in SIDES]
+        has_smells = all(os.path.exists(path) for path in smell_paths)
+        self.connection.execute('INSERT INTO samples VALUES (?, ?, ?)', (tool, smell_id, int(has_smells)))
+
+        stored = 0
+        if has_smells:
+            for side, smells_path in zip(SIDES, smell_paths):
+                rows = self.get_rows(read_smells_csv(smells_path))
+                self.connection.executemany(
+                    'INSERT INTO smells VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    [(tool, smell_id, side) + row for row in rows]
+                )
+                stored += len(rows)
+
+        for side in SIDES:
+            summary_path = os.path.join(sample_folder, SUMMARY_FILES[side])
+            if os.path.exists(summary_path):
+                with open(summary_path, 'r') as summary_file:
+                    self.connection.execute(
+                        'INSERT INTO test_summaries VALUES (?, ?, ?, ?)', (tool, smell_id, side, summary_file.read())
+                    )
+        return stored
+
+    def add_report(self, detector, project, report_path):
+        """Store the smells of a detection report. Returns the number of smells stored."""
+        rows = self.get_rows(read_smells_csv(report_path))
+        report = os.path.basename(report_path)
+        self.connection.executemany(
+            'INSERT INTO detections VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            [(detector, project, report) + row for row in rows]
+        )
+        return len(rows)
+
+def ingest(repository_path, store_path):
+    """Rebuild the store from refactoring_data/ and smells_detected/."""
+    start = time.perf_counter()
+    temporary_path = f"{store_path}.{os.getpid()}.tmp"
+    os.makedirs(os.path.dirname(os.path.abspath(store_path)), exist_ok=True)
+    connection = sqlite3.connect(temporary_path)
+    for statement in SCHEMA:
+        connection.execute(statement)
+    writer = StoreWriter(connection)
+
+    samples = smells = 0
+    refactoring_folder = os.path.join(repository_path, "refactoring_data")
+    for tool in sorted(os.listdir(refactoring_folder)) if os.path.isdir(refactoring_folder) else []:
+        tool_folder = os.path.join(refactoring_folder, tool)
+        for sample_name in sorted(os.listdir(tool_folder)):
+            if not sample_name.startswith("smell_"):
+                continue
+            smells += writer.add_sample(tool, int(sample_name[len("smell_"):]), os.path.join(tool_folder, sample_name))
+            samples += 1
+
+    reports = detections = 0
+    detected_folder = os.path.join(repository_path, "smells_detected")
+    for detector in sorted(os.listdir(detected_folder)) if os.path.isdir(detected_folder) else []:
+        detector_folder = os.path.join(detected_folder, detector)
+        for project in sorted(os.listdir(detector_folder)):
+            project_folder = os.path.join(detector_folder, project)
+            if not os.path.isdir(project_folder):
+                continue
+            for report in sorted(os.listdir(project_folder)):
+                if report.endswith(".csv"):
+                    detections += writer.add_report(detector, project, os.path.join(project_folder, report))
+                    reports += 1
+
+    connection.executemany('INSERT INTO metadata VALUES (?, ?)', [
+        ('repository_path', repository_path),
+        ('ingested_at', time.strftime('%Y-%m-%dT%H:%M:%S')),
+        ('samples', str(samples)),
+        ('smells', str(smells)),
+        ('reports', str(reports)),
+        ('detections', str(detections)),
+        ('files', str(len(writer.file_ids))),
+    ])
+    connection.commit()
+    connection.execute('VACUUM')
+    connection.close()
+    os.replace(temporary_path, store_path)
+
+    print(f"Ingested {samples} samples ({smells} smells) and {reports} reports ({detections} smells) "
+          f"into {store_path} in {time.perf_counter() - start:.1f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and inspect the consolidated results store.")
+    parser.add_argument('command', choices=['ingest', 'info'])
+    parser.add_argument('--db', default=os.getenv('RESULTS_STORE_PATH') or DEFAULT_STORE_PATH,
+                        help="store file (default: RESULTS_STORE_PATH or scripts/.results_store.sqlite)")
+    args = parser.parse_args()
+
+    if args.command == 'ingest':
+        ingest(REPOSITORY_PATH, args.db)
+        return
+
+    try:
+        store = ResultsStore(args.db)
+    except FileNotFoundError as error:
+        print(error)
+        sys.exit(1)
+    for key, value in sorted(store.get_metadata().items()):
+        print(f"{key}: {value}")
+    print(f"size: {os.path.getsize(args.db) / (1024 * 1024):.1f} MiB")
+    store.close()
+
+if __name__ == "__main__":
+    main()
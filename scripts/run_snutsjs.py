@@ -1,8 +1,10 @@
 import csv
-import subprocess
 import os
+import random
 import asyncio
+import argparse
 from dotenv import load_dotenv
+from snuts_client import SnutsClient, SnutsError
 
 # Load environment variables from .env file
 load_dotenv()
@@ -25,92 +27,174 @@ def validate_env_variable(var_name):
         raise ValueError(f"Environment variable '{var_name}' is not set.")
     return value
 
-async def run_snuts_js():
-    """Run the Snuts.js tool."""
+def iter_snuts_csv(snuts_client, directory, output_file):
+    """
+    Yield the lines of the Snuts.js CSV as they arrive, saving them to output_file.
+    The saved copy ends where the consumer stopped reading.
+    """
+    with open(output_file, 'w', newline='') as csv_file:
+        for line in snuts_client.iter_export_csv_local(directory):
+            csv_file.write(line)
+            yield line
+
+def run_snuts_js(snuts_client):
+    """Run the Snuts.js tool and return the lines of its CSV as they are downloaded."""
     projects_folder = validate_env_variable('PROJECTS_FOLDER')
     snuts_output_folder = validate_env_variable('OUTPUT_SNUTS_FOLDER')
 
     project_name = input("Enter the project name: ").strip()
+    directory = f'{projects_folder}{project_name}/'
 
-    snuts_command = (
-        f'curl -X POST http://localhost:3001/export-csv-local '
-        f'-H "Content-Type: application/json" '
-        f'-d \'{{"directory":"{projects_folder}{project_name}/"}}\' '
-        f'-o {snuts_output_folder}/output_snuts.csv'
-    )
+    log_info(f"Requesting Snuts.js analysis of {directory} from {snuts_client.base_url}")
+    return iter_snuts_csv(snuts_client, directory, f'{snuts_output_folder}/output_snuts.csv')
 
-    # log_info(f"Running command: {snuts_command}")
-    # subprocess.run(snuts_command, shell=True, check=True)
-    log_info(f"Running command: {snuts_command}")
-    process = await asyncio.create_subprocess_shell(
-        snuts_command,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE
+def filter_first(rows, selected_smell_types, max_number):
+    """Yield the first max_number rows of each selected type, stopping once every type is full."""
+    smell_type_counter = {smell_type: 0 for smell_type in selected_smell_types}
+    remaining_types = len(selected_smell_types)
+    for row in rows:
+        smell_type = row['type']
+        if smell_type_counter.get(smell_type, max_number) >= max_number:
+            continue
+        smell_type_counter[smell_type] += 1
+        yield row
+        if smell_type_counter[smell_type] == max_number:
+            remaining_types -= 1
+            if remaining_types == 0:
+                return
+
+def filter_stratified(rows, selected_smell_types, max_number, per_file):
+    """
+    Yield up to max_number rows of each selected type taking at most per_file
+    rows of a type from the same test file, so the samples are spread across files.
+    """
+    file_counter = {}
+    accepted_rows = (
+        row for row in rows
+        if row['type'] in selected_smell_types
+        and file_counter.setdefault((row['type'], row['file']), 0) < per_file
     )
-    stdout, stderr = await process.communicate()
-
-    if process.returncode == 0:
-        log_info(f"Snuts.js command completed successfully:\n{stdout.decode()}")
-    else:
-        log_error(f"Snuts.js command failed with error:\n{stderr.decode()}")
-        raise subprocess.CalledProcessError(process.returncode, snuts_command)
-
-def filter_snuts_csv():
-    """Filter the Snuts.js CSV file based on selected smell types."""
-    input_csv = validate_env_variable('SNUTS_INPUT_CSV')
+    for row in filter_first(accepted_rows, selected_smell_types, max_number):
+        file_counter[(row['type'], row['file'])] += 1
+        yield row
+
+def filter_reservoir(rows, selected_smell_types, max_number, seed=None):
+    """
+    Yield a uniform random sample of max_number rows of each selected type.
+    Only the reservoirs are kept in memory, but the whole input has to be read.
+    """
+    generator = random.Random(seed)
+    reservoirs = {smell_type: [] for smell_type in selected_smell_types}
+    seen = {smell_type: 0 for smell_type in selected_smell_types}
+    for index, row in enumerate(rows):
+        reservoir = reservoirs.get(row['type'])
+        if reservoir is None:
+            continue
+        seen[row['type']] += 1
+        if len(reservoir) < max_number:
+            reservoir.append((index, row))
+        else:
+            slot = generator.randrange(seen[row['type']])
+            if slot < max_number:
+                reservoir[slot] = (index, row)
+
+    # Keep the order of the input in the output
+    for _, row in sorted(entry for reservoir in reservoirs.values() for entry in reservoir):
+        yield row
+
+def filter_snuts_rows(rows, selected_smell_types, max_number, policy='first', per_file=1, seed=None):
+    """Apply the sampling policy to the Snuts.js rows."""
+    if policy == 'first':
+        return filter_first(rows, selected_smell_types, max_number)
+    if policy == 'stratified':
+        return filter_stratified(rows, selected_smell_types, max_number, per_file)
+    if policy == 'reservoir':
+        return filter_reservoir(rows, selected_smell_types, max_number, seed)
+    raise ValueError(f"Unknown sampling policy: {policy}")
+
+def filter_snuts_csv(lines=None, policy='first', max_number=5, per_file=1, seed=None):
+    """
+    Filter the Snuts.js CSV based on selected smell types. The CSV is read from
+    lines when given, e.g. the body streamed by run_snuts_js, or from SNUTS_INPUT_CSV,
+    and reading stops as soon as the sampling policy has all the rows it needs.
+    """
+    input_csv = 'Snuts.js response' if lines is not None else validate_env_variable('SNUTS_INPUT_CSV')
     output_csv = validate_env_variable('SNUTS_OUTPUT_CSV')
-    selected_smell_types = SELECTED_SNUTS_SMELL_TYPES.strip('[]').replace('"', '').split(',')
-    max_number = 5  # Maximum number of rows per smell type
-
-    # Initialize a dictionary to count occurrences of each smell type
-    smell_type_counter = {smell_type: 0 for smell_type in selected_smell_types}
+    selected_smell_types = SELECTED_SNUTS_SMELL_TYPES
 
     log_info(f"Selected Smell Types: {selected_smell_types}")
+    log_info(f"Sampling Policy: {policy}, {max_number} rows per smell type")
     log_info(f"Input CSV Path: {input_csv}")
     log_info(f"Output CSV Path: {output_csv}")
 
-    # Read the input CSV and filter rows
-    filtered_rows = []
     try:
-        with open(input_csv, 'r') as csv_file:
-            reader = csv.DictReader(csv_file)
-            for row in reader:
-                smell_type = row['type']
-                if smell_type in selected_smell_types:
-                    # Check if the count for this smell type has reached the maximum
-                    if smell_type_counter[smell_type] < max_number:
-                        filtered_rows.append(row)
-                        smell_type_counter[smell_type] += 1
+        csv_file = open(input_csv, 'r', newline='') if lines is None else lines
     except FileNotFoundError:
         log_error(f"Input CSV file not found: {input_csv}")
         return
-    except Exception as e:
-        log_error(f"An error occurred while reading the input CSV: {e}")
-        return
 
-    # Write the filtered rows to the output CSV
+    # Stream the filtered rows to the output CSV
     try:
-        with open(output_csv, 'w', newline='') as csv_file:
-            writer = csv.DictWriter(csv_file, fieldnames=reader.fieldnames)
+        with open(output_csv, 'w', newline='') as output_file:
+            reader = csv.DictReader(csv_file)
+            if reader.fieldnames is None:
+                log_error(f"Input CSV is empty: {input_csv}")
+                return
+            writer = csv.DictWriter(output_file, fieldnames=reader.fieldnames)
             writer.writeheader()
-            writer.writerows(filtered_rows)
-        log_info(f"Filtered CSV created successfully at: {output_csv}")
+
+            written_rows = 0
+            for row in filter_snuts_rows(reader, selected_smell_types, max_number, policy, per_file, seed):
+                writer.writerow(row)
+                written_rows += 1
+        log_info(f"Filtered CSV created successfully at: {output_csv} "
+                 f"({written_rows} rows, {reader.line_num} input lines read)")
     except Exception as e:
-        log_error(f"An error occurred while writing the output CSV: {e}")
+        log_error(f"An error occurred while filtering the CSV: {e}")
+    finally:
+        # Stops the download when the filter ended before the end of the CSV
+        if hasattr(csv_file, 'close'):
+            csv_file.close()
+
+def parse_arguments():
+    """Parse the command line arguments of the filter."""
+    parser = argparse.ArgumentParser(description="Run Snuts.js and filter its CSV by smell type.")
+    parser.add_argument('--input', action='store_true',
+                        help="filter SNUTS_INPUT_CSV instead of requesting Snuts.js")
+    parser.add_argument('--policy', choices=['first', 'reservoir', 'stratified'], default='first',
+                        help="first rows of each type, a random sample of each type, "
+                             "or rows spread across test files (default: first)")
+    parser.add_argument('--max-number', type=int, default=5, help="rows kept per smell type")
+    parser.add_argument('--per-file', type=int, default=1,
+                        help="rows of a type kept per test file with the stratified policy")
+    parser.add_argument('--seed', type=int, help="seed of the reservoir policy")
+    return parser.parse_args()
 
 async def main():
+    args = parse_arguments()
+    filter_options = (args.policy, args.max_number, args.per_file, args.seed)
+    if args.input:
+        log_info("Filtering Snuts.js CSV...")
+        filter_snuts_csv(None, *filter_options)
+        log_info("Filtering completed.")
+        return
+
+    snuts_client = SnutsClient()
     try:
         log_info("Starting the Snuts.js process...")
-        await run_snuts_js()
-        log_info("Snuts.js process completed.")
+        lines = run_snuts_js(snuts_client)
 
+        # The CSV is filtered while it is downloaded
         log_info("Filtering Snuts.js CSV...")
-        filter_snuts_csv()
-        log_info("Filtering completed.")
-    except subprocess.CalledProcessError as e:
-        log_error(f"An error occurred while running a command: {e}")
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, filter_snuts_csv, lines, *filter_options)
+        log_info("Snuts.js process and filtering completed.")
+    except SnutsError as e:
+        log_error(f"An error occurred while running Snuts.js: {e}")
     except Exception as e:
         log_error(f"An unexpected error occurred: {e}")
+    finally:
+        snuts_client.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
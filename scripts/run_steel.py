@@ -1,15 +1,15 @@
 import os
 import subprocess
-import json
 import shutil
 import csv
 from dotenv import load_dotenv
+from steel_report import iter_steel_smells
 
 # Load environment variables from .env file
 load_dotenv()
 
 # Smell types selected for detection
-SELECTED_STEEL_SMELL_TYPES = ["Assertion Roulette","Duplicate Assert","Magic Number","Lazy Test, Redudant Print"]
+SELECTED_STEEL_SMELL_TYPES = ["Assertion Roulette","Duplicate Assert","Magic Number","Lazy Test","Redundant Print"]
 
 def log_info(message):
     """Log informational messages."""
@@ -45,56 +45,45 @@ def run_steel_tool():
     subprocess.run(steel_command, shell=True, check=True)
 
 def process_steel_json_to_csv():
-    """Process the steel JSON file and convert it to a CSV."""
+    """
+    Process the steel JSON file and convert it to a CSV. The report is streamed
+    and reading stops once every selected smell type reached its maximum.
+    """
     selected_smell_types = SELECTED_STEEL_SMELL_TYPES
     number_max_smells = 5
 
     input_file = validate_env_variable('INPUT_STEEL_JSON')
     output_file = validate_env_variable('OUTPUT_STEEL_CSV')
 
-    with open(input_file, 'r') as json_file:
-        data = json.load(json_file)
-
-    smelled_files = data.get('smelledFiles', [])
-    csv_data = []
-    smell_type_counter = {}
+    smell_type_counter = {smell_type: 0 for smell_type in selected_smell_types}
     seen_entries = set()  # Track unique entries
 
-    for smelled_file in smelled_files:
-        file_name = smelled_file.get('path', 'Unknown')
-        smelled_info = smelled_file.get('smellInfo', [])
-
-        for smelled_info_item in smelled_info:
-            smell_type = smelled_info_item.get('name', 'Unknown')
-
-            if smell_type not in selected_smell_types:
-                continue
+    def keep_type(smell_type):
+        """Skip types not selected or already at their maximum without decoding their items."""
+        return smell_type_counter.get(smell_type, number_max_smells) < number_max_smells
 
-            smell_type_counter.setdefault(smell_type, 0)
+    with open(output_file, 'w', newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(['file', 'type', 'smells', 'frame'])
 
-            if smell_type_counter[smell_type] >= number_max_smells:
+        for file_name, smell_type, item in iter_steel_smells(input_file, keep_type):
+            if not keep_type(smell_type):
                 continue
 
-            items = smelled_info_item.get('items', [])
-            for item in items:
-                smell_lines = item.get('start', [])
-                frame = item.get('frame', 'Unknown')
-
-                entry = (file_name, smell_type, tuple(smell_lines), frame)  # Use a tuple for immutability
-                if entry in seen_entries:
-                    continue  # Skip duplicates
+            smell_lines = item.get('start', [])
+            frame = item.get('frame', 'Unknown')
 
-                csv_data.append([file_name, smell_type, smell_lines, frame])
-                seen_entries.add(entry)  # Mark as seen
-                smell_type_counter[smell_type] += 1
+            entry = (file_name, smell_type, str(smell_lines), frame)
+            if entry in seen_entries:
+                continue  # Skip duplicates
 
-                if smell_type_counter[smell_type] >= number_max_smells:
-                    break
+            writer.writerow([file_name, smell_type, smell_lines, frame])
+            seen_entries.add(entry)  # Mark as seen
+            smell_type_counter[smell_type] += 1
 
-    with open(output_file, 'w', newline='') as csv_file:
-        writer = csv.writer(csv_file)
-        writer.writerow(['file', 'type', 'smells', 'frame'])
-        writer.writerows(csv_data)
+            if all(count >= number_max_smells for count in smell_type_counter.values()):
+                log_info("Every selected smell type reached its maximum, stopping the report reading.")
+                break
 
     log_info(f"CSV file created successfully at: {output_file}")
 
@@ -0,0 +1,95 @@
+# ----------------------------------------------------------------------------------------
+# HTTP client for the Snuts.js server. Requests share a keep-alive connection pool,
+# are limited to a fixed number running at once, retried with exponential backoff
+# when the server is unreachable or overloaded, and the CSV body is streamed line
+# by line so it can be filtered or saved while it is being downloaded.
+# ----------------------------------------------------------------------------------------
+
+import os
+import time
+import asyncio
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+# Default address of the Snuts.js server
+DEFAULT_SNUTS_URL = "http://localhost:3001"
+
+# Statuses worth retrying; other errors from Snuts.js are not transient
+RETRY_STATUSES = {502, 503, 504}
+
+class SnutsError(Exception):
+    """Raised when Snuts.js cannot analyze a directory."""
+
+class SnutsClient:
+    """Pooled client for the /export-csv-local endpoint of Snuts.js."""
+
+    def __init__(self, base_url=None, concurrency=4, connect_timeout=5, read_timeout=600,
+                 retries=3, backoff=1.0):
+        self.base_url = (base_url or os.getenv('SNUTS_URL', DEFAULT_SNUTS_URL)).rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.slots = threading.BoundedSemaphore(concurrency)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def post_export_csv_local(self, directory):
+        """Send the analysis request, retrying transient failures, and return the streamed response."""
+        url = f"{self.base_url}/export-csv-local"
+        attempt = 0
+        while True:
+            try:
+                response = self.session.post(
+                    url, json={"directory": directory}, stream=True, timeout=self.timeout
+                )
+                if response.status_code not in RETRY_STATUSES:
+                    break
+                response.close()
+                error = SnutsError(f"Snuts.js returned {response.status_code} for {directory}")
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+
+            attempt += 1
+            if attempt > self.retries:
+                raise error
+            time.sleep(self.backoff * 2 ** (attempt - 1))
+
+        if response.status_code != 200:
+            message = response.text
+            response.close()
+            raise SnutsError(f"Snuts.js returned {response.status_code} for {directory}: {message}")
+        return response
+
+    def iter_export_csv_local(self, directory, chunk_size=64 * 1024):
+        """Yield the lines of the CSV Snuts.js produces for a directory, keeping line endings."""
+        with self.slots:
+            response = self.post_export_csv_local(directory)
+            with response:
+                # Snuts.js sends text/csv without a charset, which requests would read as ISO-8859-1
+                response.encoding = 'utf-8'
+                pending = ''
+                for chunk in response.iter_content(chunk_size=chunk_size, decode_unicode=True):
+                    lines = (pending + chunk).split('\n')
+                    pending = lines.pop()
+                    for line in lines:
+                        yield line + '\n'
+                if pending:
+                    yield pending
+
+    def export_csv_local(self, directory, output_file):
+        """Stream the CSV Snuts.js produces for a directory into output_file."""
+        with open(output_file, 'w', newline='', encoding='utf-8') as csv_file:
+            for line in self.iter_export_csv_local(directory):
+                csv_file.write(line)
+
+    async def export_csv_local_async(self, directory, output_file):
+        """Run export_csv_local in a worker thread so the event loop keeps other requests going."""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.export_csv_local, directory, output_file)
+
+    def close(self):
+        """Close the pooled connections."""
+        self.session.close()
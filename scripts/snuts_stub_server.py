@@ -0,0 +1,98 @@
+# ----------------------------------------------------------------------------------------
+# Local stand-in for the Snuts.js server, used to try the scripts without Node.js.
+# It answers POST /export-csv-local with a fixed CSV (by default a small generated
+# one), keeps connections alive, and can delay answers or fail the first requests
+# to exercise the concurrency limit and the retries of the client.
+#
+# Usage: python snuts_stub_server.py --port 3001 --csv output_snuts.csv --fail-first 2
+# ----------------------------------------------------------------------------------------
+
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Columns of the CSV produced by Snuts.js
+SNUTS_COLUMNS = '"file","type","smells","itCount","describeCount"'
+
+def generate_csv(rows):
+    """Return a Snuts.js like CSV with the given number of smell rows."""
+    smell_types = ["ConditionalTestLogic", "OvercommentedTest", "SubOptimalAssert",
+                   "TestWithoutDescription", "SensitiveEquality", "GeneralFixture"]
+    lines = [SNUTS_COLUMNS]
+    for index in range(rows):
+        smell_type = smell_types[index % len(smell_types)]
+        lines.append(
+            f'"tests/unit/file{index % 10}.test.js","{smell_type}",'
+            f'"[{{""startLine"":{index},""endLine"":{index}}}]",5,1'
+        )
+    return '\n'.join(lines)
+
+class SnutsStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        print(f"[STUB] {self.address_string()} {format % args}")
+
+    def send_body(self, status, content_type, body):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        server = self.server
+
+        if self.path != '/export-csv-local':
+            self.send_body(404, 'application/json', json.dumps({"message": "Not found"}))
+            return
+        if not payload.get('directory'):
+            self.send_body(403, 'application/json',
+                           json.dumps({"message": "You should provide the directory of the project"}))
+            return
+
+        with server.lock:
+            server.requests += 1
+            request_number = server.requests
+        if request_number <= server.fail_first:
+            self.send_body(503, 'application/json', json.dumps({"message": "Stub server is warming up"}))
+            return
+
+        time.sleep(server.delay)
+        self.send_body(200, 'text/csv', server.csv)
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stub of the Snuts.js server.")
+    parser.add_argument('--port', type=int, default=3001)
+    parser.add_argument('--csv', help="CSV file returned for every directory")
+    parser.add_argument('--rows', type=int, default=50, help="rows of the generated CSV when --csv is not given")
+    parser.add_argument('--delay', type=float, default=0.0, help="seconds to wait before answering")
+    parser.add_argument('--fail-first', type=int, default=0, help="answer 503 to the first N requests")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), SnutsStubHandler)
+    if args.csv:
+        with open(args.csv, 'r', encoding='utf-8') as csv_file:
+            server.csv = csv_file.read()
+    else:
+        server.csv = generate_csv(args.rows)
+    server.delay = args.delay
+    server.fail_first = args.fail_first
+    server.requests = 0
+    server.lock = threading.Lock()
+
+    print(f"[STUB] Snuts.js stub listening on http://127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
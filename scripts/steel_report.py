@@ -0,0 +1,226 @@
+# ----------------------------------------------------------------------------------------
+# Streaming reader for the steel.json report. The report is walked in chunks and
+# only one smell item is decoded at a time, and the values that are not needed are
+# scanned without being decoded, so memory is bounded by the largest item kept
+# rather than by the size of the project. Callers can stop reading as soon as they
+# have enough.
+# ----------------------------------------------------------------------------------------
+
+import re
+import json
+
+# Characters JSON allows between tokens
+WHITESPACE = ' \t\n\r'
+
+# Longest run of a string up to its closing quote or an escape cut by the end of a chunk
+STRING_CONTENT = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*', re.DOTALL)
+
+# Longest run of an array or object up to a bracket or a string cut by the end of a chunk
+CONTAINER_CONTENT = re.compile(r'(?:[^"{}\[\]]+|"[^"\\]*(?:\\.[^"\\]*)*")*', re.DOTALL)
+
+# First character after a number, true, false or null
+SCALAR_END = re.compile(r'[\s,\]}]')
+
+class JsonStreamReader:
+    """Pull parser over a JSON file read in chunks."""
+
+    def __init__(self, file, chunk_size=64 * 1024):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.position = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def fill(self):
+        """Read the next chunk, dropping the part of the buffer already parsed."""
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+
+    def peek(self):
+        """Return the next character that is not whitespace, or '' at the end of the file."""
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in WHITESPACE:
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if self.eof:
+                return ''
+            self.fill()
+
+    def expect(self, character):
+        """Consume the next character, which must be the given one."""
+        found = self.peek()
+        if found != character:
+            raise ValueError(f"Expected '{character}' but found '{found}' in the JSON report")
+        self.position += 1
+
+    def advance(self, parts, start, end, keep):
+        """Keep the scanned text up to end if asked, then read the next chunk. Returns the new start."""
+        if self.eof:
+            raise ValueError("Unexpected end of the JSON report")
+        if keep:
+            parts.append(self.buffer[start:end])
+        self.position = end
+        self.fill()
+        return self.position
+
+    def scan_value(self, keep):
+        """
+        Consume the next value, tracking strings, escapes and the depth of
+        brackets, and return its text if keep is set. Each chunk is
+        scanned once and dropped after it, so a value that is not kept never
+        takes more than one chunk of memory.
+        """
+        first = self.peek()
+        if not first:
+            raise ValueError("Unexpected end of the JSON report")
+        parts = []
+        start = self.position
+
+        if first in '{["':
+            depth = 1 if first != '"' else 0
+            in_string = first == '"'
+            self.position += 1
+            while depth or in_string:
+                if in_string:
+                    end = STRING_CONTENT.match(self.buffer, self.position).end()
+                    if end >= len(self.buffer) or self.buffer[end] == '\\':
+                        start = self.advance(parts, start, end, keep)
+                        continue
+                    self.position = end + 1
+                    in_string = False
+                    continue
+
+                end = CONTAINER_CONTENT.match(self.buffer, self.position).end()
+                if end >= len(self.buffer):
+                    start = self.advance(parts, start, end, keep)
+                    continue
+                character = self.buffer[end]
+                self.position = end + 1
+                if character == '"':
+                    in_string = True
+                elif character in '{[':
+                    depth += 1
+                else:
+                    depth -= 1
+        else:
+            # Number, true, false or null, which may continue in the next chunk
+            while True:
+                match = SCALAR_END.search(self.buffer, self.position)
+                if match is not None:
+                    self.position = match.start()
+                    break
+                if self.eof:
+                    self.position = len(self.buffer)
+                    break
+                start = self.advance(parts, start, len(self.buffer), keep)
+
+        if keep:
+            parts.append(self.buffer[start:self.position])
+            return ''.join(parts)
+        return None
+
+    def read_value(self):
+        """Decode the next value, reading more chunks until it is complete."""
+        return self.decoder.decode(self.scan_value(keep=True))
+
+    def skip_value(self):
+        """Consume the next value without decoding or keeping it."""
+        self.scan_value(keep=False)
+
+    def iter_object(self):
+        """Yield the keys of the next object; the caller must consume each value."""
+        self.expect('{')
+        if self.peek() == '}':
+            self.position += 1
+            return
+        while True:
+            key = self.read_value()
+            self.expect(':')
+            yield key
+            if self.peek() == ',':
+                self.position += 1
+                continue
+            self.expect('}')
+            return
+
+    def iter_array(self):
+        """Yield once per element of the next array; the caller must consume each element."""
+        self.expect('[')
+        if self.peek() == ']':
+            self.position += 1
+            return
+        while True:
+            yield
+            if self.peek() == ',':
+                self.position += 1
+                continue
+            self.expect(']')
+            return
+
+def iter_smell_items(reader, file_name, keep_type):
+    """Yield (file, type, item) for the smellInfo array of a smelled file."""
+    for _ in reader.iter_array():
+        smell_type = None
+        pending_items = []
+        for key in reader.iter_object():
+            if key == 'name':
+                smell_type = reader.read_value()
+            elif key == 'items':
+                if smell_type is not None and not keep_type(smell_type):
+                    reader.skip_value()
+                    continue
+                for _ in reader.iter_array():
+                    item = reader.read_value()
+                    if smell_type is None:
+                        # Keep the items until the name of the smell shows up
+                        pending_items.append(item)
+                    else:
+                        yield file_name, smell_type, item
+            else:
+                reader.skip_value()
+
+        smell_type = smell_type if smell_type is not None else 'Unknown'
+        if pending_items and keep_type(smell_type):
+            for item in pending_items:
+                yield file_name, smell_type, item
+
+def iter_steel_smells(input_file, keep_type=None):
+    """
+    Yield (file, type, item) for every smell item of a steel.json report,
+    walking smelledFiles[].smellInfo[].items[] without loading the report.
+    Items of types rejected by keep_type are skipped without being yielded.
+    """
+    if keep_type is None:
+        keep_type = lambda smell_type: True
+
+    with open(input_file, 'r') as json_file:
+        reader = JsonStreamReader(json_file)
+        for key in reader.iter_object():
+            if key != 'smelledFiles':
+                reader.skip_value()
+                continue
+
+            for _ in reader.iter_array():
+                file_name = None
+                pending_smells = []
+                for file_key in reader.iter_object():
+                    if file_key == 'path':
+                        file_name = reader.read_value()
+                    elif file_key == 'smellInfo':
+                        for smell in iter_smell_items(reader, file_name, keep_type):
+                            if file_name is None:
+                                # Keep the smells until the path of the file shows up
+                                pending_smells.append(smell)
+                            else:
+                                yield smell
+                    else:
+                        reader.skip_value()
+
+                file_name = file_name if file_name is not None else 'Unknown'
+                for _, smell_type, item in pending_smells:
+                    yield file_name, smell_type, item